@@ -4,6 +4,8 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+from utils.http import close_http_session
+
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -23,7 +25,10 @@ async def load_cogs():
 async def main():
     async with bot:
         await load_cogs()
-        await bot.start(os.getenv("BOT_TOKEN"))
+        try:
+            await bot.start(os.getenv("BOT_TOKEN"))
+        finally:
+            await close_http_session()
 
 if __name__ == "__main__":
     import asyncio
@@ -1,8 +1,92 @@
 import os
+import time
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import google.generativeai as genai
 
+from utils.chatcache import ResponseCache
+from utils.chatmemory import CHAT_SUMMARY_TOKENS, ChatMemory
+from utils.chatqueue import ChatScheduler
+
+# Discord messages are capped at 2000 characters; leave a little headroom
+MAX_MESSAGE_LEN = 1990
+# Minimum seconds between edits of the message a reply is streamed into (Discord rate-limits edits)
+STREAM_EDIT_INTERVAL = float(os.getenv("CHAT_STREAM_EDIT_INTERVAL", "1.0"))
+# How often changed chat memory is written to disk (seconds)
+CHAT_MEMORY_SAVE_INTERVAL = float(os.getenv("CHAT_MEMORY_SAVE_INTERVAL", "60"))
+
+
+def split_point(text: str, start: int, max_len: int = MAX_MESSAGE_LEN):
+    """
+    Where the message beginning at text[start] has to end, or None if the rest still fits.
+    Breaks after the last period or at the last newline within max_len, else hard at max_len.
+    Returns (end of this message, start of the next).
+    """
+    end = start + max_len
+    if len(text) <= end:
+        return None
+    newline = text.rfind("\n", start, end)
+    period = text.rfind(".", start, end)
+    if max(newline, period) <= start:
+        return end, end
+    if period > newline:
+        return period + 1, period + 1
+    return newline, newline + 1
+
+
+def chunk_text(chunk) -> str:
+    """Text of one streamed chunk ('' for chunks without text, e.g. the final safety/usage chunk)."""
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+
+class ReplyStream:
+    """
+    Posts a reply while it is still being generated.
+
+    The first text is sent as soon as it arrives, then the same message is edited as more comes in
+    (at most once per STREAM_EDIT_INTERVAL). Once a message would pass MAX_MESSAGE_LEN it is
+    finalised at a sentence/newline boundary and the rest continues in a new message.
+    """
+
+    def __init__(self, channel, interval: float = STREAM_EDIT_INTERVAL):
+        self.channel = channel
+        self.interval = interval
+        self.text = ""
+        self.start = 0  # offset in self.text where the current message begins
+        self.message = None
+        self.shown = ""
+        self.last_edit = 0.0
+
+    async def feed(self, piece: str):
+        self.text += piece
+        while (cut := split_point(self.text, self.start)) is not None:
+            end, next_start = cut
+            await self._show(self.text[self.start:end], force=True)
+            self.message, self.shown, self.start = None, "", next_start
+        await self._show(self.text[self.start:])
+
+    async def finish(self) -> str:
+        """Flush the last edit; returns the whole reply."""
+        await self._show(self.text[self.start:], force=True)
+        return self.text
+
+    async def _show(self, content: str, force: bool = False):
+        content = content.strip()
+        if not content or content == self.shown:
+            return
+        if self.message is None:
+            self.message = await self.channel.send(content, allowed_mentions=discord.AllowedMentions.none())
+        elif force or time.monotonic() - self.last_edit >= self.interval:
+            await self.message.edit(content=content, allowed_mentions=discord.AllowedMentions.none())
+        else:
+            return
+        self.shown = content
+        self.last_edit = time.monotonic()
+
+
 class Chat(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -17,9 +101,37 @@ class Chat(commands.Cog):
                 "Keep replies under ~1500 characters. Avoid @-mentioning users."
             ),
         )
-        # Keep role-structured messages per channel:
-        # contents = [{"role": "user"|"model", "parts": [text]}]
-        self.memory = {}  # {channel_id: [content_dict, ...]}
+        # Role-structured messages per channel ({"role": "user"|"model", "parts": [text]}),
+        # token-budgeted with a rolling summary and saved to data/chat_memory.json
+        self.memory = ChatMemory(summarize=self._summarize)
+        # One generation at a time per channel, a few across the bot; extra mentions get a busy reply
+        self.scheduler = ChatScheduler(self._respond)
+        # Answers to repeated standalone questions ("how do I join"), served without calling Gemini
+        self.cache = ResponseCache()
+        self.save_memory.start()
+
+    async def cog_unload(self):
+        self.save_memory.cancel()
+        self.scheduler.close()
+        await self.memory.save()
+
+    @tasks.loop(seconds=CHAT_MEMORY_SAVE_INTERVAL)
+    async def save_memory(self):
+        await self.memory.save()
+
+    async def _summarize(self, summary, turns):
+        """Fold old turns into the channel's running summary with Gemini."""
+        transcript = "\n".join(
+            ("Bot: " if t["role"] == "model" else "") + " ".join(t["parts"]) for t in turns
+        )
+        prompt = (
+            "Update the running summary of this Discord conversation with the new messages. "
+            "Keep who said what, facts, decisions and open questions; drop small talk. "
+            f"Reply with the summary only, under {CHAT_SUMMARY_TOKENS * 3} characters.\n\n"
+            f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+        )
+        resp = await self.model.generate_content_async(prompt)
+        return resp.text
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -39,45 +151,59 @@ class Chat(commands.Cog):
             )
             return
 
+        # Serve repeated questions straight from the cache, unless earlier messages here are still queued
+        scope = message.guild.id if message.guild else message.channel.id
+        if self.scheduler.idle(message.channel.id):
+            cached = self.cache.get(scope, prompt)
+            if cached is not None:
+                await self._send_cached(message, prompt, cached)
+                return
+
+        if not self.scheduler.submit(message.channel.id, (message, prompt)):
+            await message.channel.send(
+                "🚦 I'm answering a lot of messages right now. Please try again in a minute!",
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+
+    async def _send_cached(self, message, prompt, reply):
         cid = message.channel.id
-        history = self.memory.setdefault(cid, [])
+        self.memory.add(cid, "user", f"{message.author.display_name}: {prompt}")
+        self.memory.add(cid, "model", reply)
+        try:
+            stream = ReplyStream(message.channel)
+            await stream.feed(reply)
+            await stream.finish()
+        except Exception as e:
+            await message.channel.send(f"⚠️ Error: {e}")
+        await self.memory.compact(cid)
 
-        # Append just the user's text (optionally include display name *inside* the text)
-        history.append({"role": "user", "parts": [f"{message.author.display_name}: {prompt}"]})
-        # Keep last 20 turns
-        if len(history) > 40:  # (user+model pairs ≈ 20 turns)
-            history[:] = history[-40:]
+    async def _respond(self, cid, batch):
+        """Answer a channel's queued mentions [(message, prompt), ...] with a single generation."""
+        message = batch[-1][0]
+        # Append just the user's text (optionally include display name *inside* the text);
+        # coalesced messages become one user turn so roles keep alternating
+        self.memory.add(cid, "user", "\n".join(f"{queued.author.display_name}: {prompt}" for queued, prompt in batch))
 
         try:
-            # Give Gemini *structured* history
-            resp = self.model.generate_content(contents=history)
-            reply = (resp.text or "").strip()
-
-            # Append model turn (role **must** be "model")
-            history.append({"role": "model", "parts": [reply]})
-
-            # Smart chunking at sentence or newline boundaries
-            max_len = 1990
-            start = 0
-            while start < len(reply):
-                end = min(start + max_len, len(reply))
-
-                # Try to break at the last newline or period before max_len
-                split_at = max(reply.rfind('\n', start, end), reply.rfind('.', start, end))
-
-                # If neither found in range, just break at max_len
-                if split_at == -1 or split_at <= start:
-                    split_at = end
-                if end==len(reply):
-                    split_at=end
-                chunk = reply[start:split_at].strip()
-                if chunk:
-                    await message.channel.send(
-                        chunk,
-                        allowed_mentions=discord.AllowedMentions.none()
-                    )
-
-                start = split_at + 1
+            # Give Gemini *structured* history; stream it so text shows up while it is generated
+            # and the event loop stays free for everything else
+            stream = ReplyStream(message.channel)
+            async with message.channel.typing():
+                response = await self.model.generate_content_async(contents=self.memory.history(cid), stream=True)
+                async for chunk in response:
+                    await stream.feed(chunk_text(chunk))
+            reply = (await stream.finish()).strip()
+            if not reply:
+                await message.channel.send("⚠️ Error: Gemini returned an empty reply.")
+                return
+
+            # Append model turn (role **must** be "model"), then fold old turns into the summary if over budget
+            self.memory.add(cid, "model", reply)
+            if len(batch) == 1:
+                author = message.author
+                names = {author.display_name, author.name, getattr(author, "global_name", None)}
+                self.cache.put(message.guild.id if message.guild else cid, cid, batch[0][1], reply, author_names=names)
+            await self.memory.compact(cid)
 
         except Exception as e:
             await message.channel.send(f"⚠️ Error: {e}")
@@ -86,14 +212,30 @@ class Chat(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def forget_all(self, ctx):
         self.memory.clear()
+        self.cache.clear()
         await ctx.send("🧠 All memory cleared. Starting completely fresh!")
 
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def forget_here(self, ctx):
-        if ctx.channel.id in self.memory:
-            del self.memory[ctx.channel.id]
+        self.memory.forget(ctx.channel.id)
+        self.cache.forget_channel(ctx.channel.id)
         await ctx.send("🧹 Memory cleared for this channel!")
 
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def chat_stats(self, ctx):
+        """Cache hit rate, queue and memory stats for the chatbot."""
+        c, q, m = self.cache.stats, self.scheduler.stats, self.memory.stats
+        await ctx.send(
+            "📊 **Chat stats**\n"
+            f"Cache: {'on' if self.cache.enabled else 'off'}, {len(self.cache)} answers, "
+            f"{c['hits']} hits / {c['misses']} misses ({self.cache.hit_rate():.0%}), "
+            f"{c['personal']} personal replies skipped, {c['expired']} expired, {c['evicted']} evicted\n"
+            f"Queue: {self.scheduler.pending} waiting, {q['batches']} generations for {q['messages']} messages "
+            f"({q['coalesced']} coalesced), {q['shed']} turned away, peak {q['max_pending']} waiting\n"
+            f"Memory: {len(self.memory)} channels, {m['compactions']} summaries, {m['evicted']} channels evicted"
+        )
+
 async def setup(bot):
     await bot.add_cog(Chat(bot))
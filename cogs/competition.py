@@ -1,31 +1,60 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
-import subprocess
-import csv
-import zipfile
 import os
-import sqlite3
 import json
 import time
 
+from utils.db import get_database
+from utils.leaderboard import LeaderboardCache, LeaderboardDownloader, LeaderboardUnavailable
+from utils.links import get_link_directory
+from utils.ratelimit import (
+    PRIORITY_BROWSE, PRIORITY_FREEZE, PRIORITY_JOIN, PRIORITY_LEADERBOARD, PRIORITY_NAMES, get_kaggle_limiter,
+)
+from utils.scheduler import ExpiryScheduler
+from utils.snapshots import SnapshotStore
+
 DB_FILE = "data/competition.db"
+# How often we snapshot leaderboards of problems that still have active participants (seconds)
+SNAPSHOT_INTERVAL = float(os.getenv("LEADERBOARD_SNAPSHOT_INTERVAL", "300"))
+# How many of one operation's problems we resolve at once, and how long each one may take (seconds)
+PROBLEM_FETCH_CONCURRENCY = int(os.getenv("PROBLEM_FETCH_CONCURRENCY", "4"))
+PROBLEM_FETCH_TIMEOUT = float(os.getenv("PROBLEM_FETCH_TIMEOUT", "150"))
+# If a freeze can't get its leaderboards, retry it this many times, this many seconds apart
+FREEZE_MAX_RETRIES = int(os.getenv("FREEZE_MAX_RETRIES", "3"))
+FREEZE_RETRY_DELAY = float(os.getenv("FREEZE_RETRY_DELAY", "60"))
 
 
 class CompetitionCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.active_comps = {}
+        self.db = get_database(DB_FILE)
+        self.links = get_link_directory()  # discord_id <-> kaggle_id, in memory
+        self.leaderboards = LeaderboardCache()  # {comp_id: parsed leaderboard}, TTL-bounded
+        self.snapshots = SnapshotStore()  # timestamped leaderboard history, used for freezes
+        self.downloader = LeaderboardDownloader(self.leaderboards, store=self.snapshots)
+        self.scheduler = ExpiryScheduler(self._on_timers_expired)  # every participant's freeze timer
+        self._freeze_attempts = {}  # {(comp_type, user_id): failed freeze attempts so far}
+        self._joining = set()  # {(comp_type, user_id)} whose join is still fetching scores
         os.makedirs("data", exist_ok=True)
         os.makedirs("data/leaderboard", exist_ok=True)
         os.makedirs("data/competitions_jsons", exist_ok=True)
         self.init_db()
         self.bot.loop.create_task(self._recover_after_ready())
+        self.snapshot_leaderboards.start()
+
+    def cog_unload(self):
+        self.snapshot_leaderboards.cancel()
+        self.scheduler.stop()
 
 
     # ------------------ DB Setup ------------------
     def init_db(self):
-        conn = sqlite3.connect(DB_FILE)
+        self.db.run_blocking(self._create_tables)
+
+    @staticmethod
+    def _create_tables(conn):
         c = conn.cursor()
 
         # Store frozen scores
@@ -51,8 +80,41 @@ class CompetitionCog(commands.Cog):
             PRIMARY KEY (user_id, comp_type, comp_id)
         )""")
 
+        # Materialized leaderboard standings, maintained on join/freeze/kick
+        # scores = JSON {comp_id: [score, norm_score]}; only meaningful once active=0 (frozen)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS standings (
+            comp_type TEXT,
+            user_id TEXT,
+            active INTEGER,
+            norm_sum REAL,
+            scores TEXT,
+            PRIMARY KEY (comp_type, user_id)
+        )""")
+        c.execute("""
+        CREATE INDEX IF NOT EXISTS standings_rank
+        ON standings (comp_type, active, norm_sum DESC)
+        """)
+
+        # Backfill from data recorded before standings existed
+        c.execute("SELECT 1 FROM standings LIMIT 1")
+        if c.fetchone() is None:
+            c.execute("""
+                INSERT OR IGNORE INTO standings (comp_type, user_id, active, norm_sum, scores)
+                SELECT comp_type, user_id, 1, 0.0, '{}' FROM participants GROUP BY comp_type, user_id
+            """)
+            c.execute("""
+                SELECT user_id, comp_type, comp_id, score, norm_score FROM frozen_scores
+            """)
+            frozen = {}
+            for user_id, comp_type, comp_id, score, norm in c.fetchall():
+                frozen.setdefault((comp_type, user_id), {})[comp_id] = [score, norm]
+            c.executemany(
+                "INSERT OR REPLACE INTO standings VALUES (?, ?, 0, ?, ?)",
+                [(ct, uid, sum(v[1] for v in sc.values()), json.dumps(sc)) for (ct, uid), sc in frozen.items()]
+            )
+
         conn.commit()
-        conn.close()
 
     async def load_active_comps(self):
         """Load existing competitions from JSON files into memory on startup and restore timers."""
@@ -60,11 +122,9 @@ class CompetitionCog(commands.Cog):
         os.makedirs(folder, exist_ok=True)
 
         # We assume we're running after wait_until_ready(), so guilds are available.
-        guilds = list(self.bot.guilds)
-        if not guilds:
+        if not self.bot.guilds:
             print("⚠️ No guilds found; skipping timer recovery for now.")
             return
-        guild = guilds[0]  # pick your primary guild, or locate by ID if you prefer
 
         for file in os.listdir(folder):
             if not file.endswith(".json"):
@@ -76,6 +136,7 @@ class CompetitionCog(commands.Cog):
                 self.active_comps[comp_type] = {
                     "thread_id": data["thread_id"],
                     "discussion_id": data.get("discussion_id"),
+                    "guild_id": data.get("guild_id"),
                     "name": data["name"],
                     "duration": data["duration"],
                     "direction": data["direction"],
@@ -89,73 +150,64 @@ class CompetitionCog(commands.Cog):
                 print(f"⚠️ Failed to load competition from {file}: {e}")
                 continue
 
-            # Restore participants (MERGE baselines for multi-problem comps)
-            conn = sqlite3.connect(DB_FILE)
-            c = conn.cursor()
-            c.execute("""
-                SELECT user_id, comp_id, baseline, active, joined_at
-                FROM participants
-                WHERE comp_type=?
-            """, (comp_type,))
-            rows = c.fetchall()
-            conn.close()
-
-            for user_id, comp_id, baseline, active, joined_at in rows:
-                p = self.active_comps[comp_type]["participants"].setdefault(
-                    user_id,
-                    {"baseline": {}, "active": bool(active), "joined_at": joined_at}
-                )
-                # Merge multiple comp_id baselines
-                p["baseline"][comp_id] = baseline
-                # Keep the most recent joined_at and any active truthy
-                p["active"] = bool(active) or p.get("active", False)
-                if not p.get("joined_at") or (joined_at and joined_at > p["joined_at"]):
-                    p["joined_at"] = joined_at
+        # Restore participants for every competition in one query (MERGE baselines for multi-problem comps)
+        rows = await self.db.fetchall(
+            "SELECT comp_type, user_id, comp_id, baseline, active, joined_at FROM participants"
+        )
 
-            print(f"✅ Restored {len(rows)} participant row(s) for {comp_type}")
+        for comp_type, user_id, comp_id, baseline, active, joined_at in rows:
+            comp = self.active_comps.get(comp_type)
+            if not comp:
+                continue
+            p = comp["participants"].setdefault(
+                user_id,
+                {"baseline": {}, "active": bool(active), "joined_at": joined_at}
+            )
+            # Merge multiple comp_id baselines
+            p["baseline"][comp_id] = baseline
+            # Keep the most recent joined_at and any active truthy
+            p["active"] = bool(active) or p.get("active", False)
+            if not p.get("joined_at") or (joined_at and joined_at > p["joined_at"]):
+                p["joined_at"] = joined_at
 
-            # Re-schedule or finalize timers
-            now = time.time()
-            duration_sec = self.active_comps[comp_type]["duration"] * 60
+        print(f"✅ Restored {len(rows)} participant row(s)")
 
-            for user_id, pdata in self.active_comps[comp_type]["participants"].items():
+        # Re-schedule timers; ones that expired while offline fire right away, batched per competition
+        now = time.time()
+        expired = 0
+        for comp_type, comp in self.active_comps.items():
+            for user_id, pdata in comp["participants"].items():
                 if not pdata.get("active"):
                     continue
-                joined_at = pdata.get("joined_at") or now  # fallback
-                remaining = duration_sec - (now - joined_at)
-
-                if remaining <= 0:
-                    # Timer expired while offline → freeze immediately
-                    asyncio.create_task(self.freeze_participant(guild, comp_type, user_id))
-                    print(f"🧊 Auto-froze expired participant {user_id} in {comp_type}")
-                else:
-                    # Still time left → reschedule
-                    async def resume_timer(uid=user_id, delay=remaining, ctype=comp_type, g=guild):
-                        await asyncio.sleep(delay)
-                        await self.freeze_participant(g, ctype, uid)
-                    asyncio.create_task(resume_timer())
-                    print(f"⏳ Rescheduled timer for {user_id} in {comp_type}, {remaining/60:.1f}m left")
-
-
-    def save_participant(self, user_id: str, comp_type: str, comp_id: str, baseline: float, active: bool):
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        joined_at = time.time()  # seconds since loop start, fine for relative timers
-        c.execute("""
-            INSERT INTO participants (user_id, comp_type, comp_id, baseline, active, joined_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(user_id, comp_type, comp_id)
-            DO UPDATE SET baseline=excluded.baseline, active=excluded.active, joined_at=excluded.joined_at
-        """, (user_id, comp_type, comp_id, baseline, 1 if active else 0, joined_at))
-        conn.commit()
-        conn.close()
+                pdata["joined_at"] = pdata.get("joined_at") or now  # fallback
+                expires_at = self._expires_at(comp, pdata)
+                self.scheduler.schedule(comp_type, user_id, expires_at)
+                if expires_at <= now:
+                    expired += 1
+        print(f"⏳ Scheduled {len(self.scheduler)} timer(s), {expired} already expired and freezing now")
 
-    def remove_participant(self, user_id: str, comp_type: str):
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("DELETE FROM participants WHERE user_id=? AND comp_type=?", (user_id, comp_type))
-        conn.commit()
-        conn.close()
+
+    async def save_participant(self, user_id: str, comp_type: str, baselines, joined_at: float):
+        """
+        Record a (re)joined participant in one transaction: a participants row per problem
+        (baselines is {comp_id: baseline}) and an active standings row with no frozen scores yet.
+        """
+        def _save(conn):
+            conn.executemany("""
+                INSERT INTO participants (user_id, comp_type, comp_id, baseline, active, joined_at)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT(user_id, comp_type, comp_id)
+                DO UPDATE SET baseline=excluded.baseline, active=excluded.active, joined_at=excluded.joined_at
+            """, [(user_id, comp_type, comp_id, baseline, joined_at) for comp_id, baseline in baselines.items()])
+            conn.execute("INSERT OR REPLACE INTO standings VALUES (?, ?, 1, 0.0, '{}')", (comp_type, user_id))
+        await self.db.transaction(_save)
+
+    async def remove_participant(self, user_id: str, comp_type: str):
+        """Delete everything recorded for a participant. Safe to call more than once."""
+        def _remove(conn):
+            conn.execute("DELETE FROM participants WHERE user_id=? AND comp_type=?", (user_id, comp_type))
+            conn.execute("DELETE FROM standings WHERE user_id=? AND comp_type=?", (user_id, comp_type))
+        await self.db.transaction(_remove)
 
     # ------------------ Helpers ------------------
     def _compute_norm(self, direction: str, baseline: float, score: float, min_score: float, max_score: float) -> float:
@@ -181,122 +233,154 @@ class CompetitionCog(commands.Cog):
     # ------------------ Kaggle Fetch ------------------
     async def _recover_after_ready(self):
         await asyncio.sleep(5)
-        await self.load_active_comps()  # now guilds/threads are available
-
-    async def fetch_kaggle_score(self, comp_id, discord_id: int):
+        try:
+            await self.load_active_comps()  # now guilds/threads are available
+        except Exception as e:
+            print(f"⚠️ Recovering active competitions failed: {e}")
+        finally:
+            # Timers for later joins must fire even if recovery went wrong
+            self.scheduler.start()
+
+    def _comp_guild(self, comp):
+        """The guild a competition runs in: its saved guild_id, else the guild its thread belongs to."""
+        guild = self.bot.get_guild(comp["guild_id"]) if comp.get("guild_id") else None
+        if guild is None:
+            for channel_id in (comp["thread_id"], comp.get("discussion_id")):
+                channel = self.bot.get_channel(channel_id) if channel_id else None
+                if channel is not None:
+                    return channel.guild
+        return guild
+
+    def _expires_at(self, comp, pdata) -> float:
+        return (pdata.get("joined_at") or time.time()) + comp["duration"] * 60
+
+    async def _on_timers_expired(self, comp_type: str, user_ids):
+        await self.freeze_participants(None, comp_type, user_ids)
+
+    async def get_leaderboard(self, comp_id, priority: int = PRIORITY_LEADERBOARD):
+        """Return the cached Leaderboard for comp_id, downloading it if missing or stale."""
+        return await self.downloader.get(comp_id, priority=priority)
+
+    async def fetch_kaggle_scores(self, comp_id, discord_ids, strict: bool = False,
+                                  priority: int = PRIORITY_LEADERBOARD):
         """
-        Download leaderboard and return (user_score, min_score, max_score) for this Discord user.
+        Return {discord_id_str: (user_score, min_score, max_score)} for many Discord users,
+        all resolved against one leaderboard snapshot.
+        With strict=True a leaderboard that can't be downloaded raises LeaderboardUnavailable
+        instead of falling back to (0.0, 0.0, 1.0). `priority` is the Kaggle rate limiter class.
         """
-        base_dir = os.path.join("data", "leaderboard")
-        latest_dir = os.path.join(base_dir, f"{comp_id}_latest")
-        os.makedirs(latest_dir, exist_ok=True)
-
-        # 1) Clear old files
-        for f in os.listdir(latest_dir):
-            try:
-                os.remove(os.path.join(latest_dir, f))
-            except Exception:
-                pass
-
-        # 2) Download leaderboard via Kaggle CLI
-        try:
-            print(f"📥 Downloading leaderboard for {comp_id}...")
-            subprocess.run(
-                ["kaggle", "competitions", "leaderboard", comp_id, "--download", "-p", latest_dir],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Kaggle CLI failed: {e.stderr or e.stdout}")
-            # Return a safe tuple: (user, min, max)
-            return 0.0, 0.0, 1.0
-
-        # 3) Extract the zip
-        zip_files = [f for f in os.listdir(latest_dir) if f.endswith(".zip")]
-        if not zip_files:
-            print(f"❌ No zip file found for {comp_id}")
-            return 0.0, 0.0, 1.0
-
-        for zf in zip_files:
-            zip_path = os.path.join(latest_dir, zf)
+        ids = [str(d) for d in discord_ids]
+        # Return a safe tuple: (user, min, max)
+        results = {uid: (0.0, 0.0, 1.0) for uid in ids}
+
+        kaggle_ids = self.links.kaggle_ids(ids)
+        for uid in ids:
+            if uid not in kaggle_ids:
+                print(f"⚠️ No Kaggle ID linked for Discord user {uid}")
+        if not kaggle_ids:
+            return results
+
+        board = await self.get_leaderboard(comp_id, priority)
+        if board is None:
+            if strict:
+                raise LeaderboardUnavailable(f"leaderboard for {comp_id} could not be downloaded")
+            return results
+
+        for uid, kaggle_id in kaggle_ids.items():
+            results[uid] = board.lookup(kaggle_id)
+        return results
+
+    @tasks.loop(seconds=SNAPSHOT_INTERVAL)
+    async def snapshot_leaderboards(self):
+        """Keep the snapshot store current for every problem someone is still working on."""
+        comp_ids = {
+            comp_id
+            for comp in self.active_comps.values()
+            if any(p.get("active") for p in comp["participants"].values())
+            for comp_id in comp["problems"]
+        }
+        for comp_id in comp_ids:
             try:
-                with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                    zip_ref.extractall(latest_dir)
-                print(f"✅ Extracted {zf}")
+                await self.get_leaderboard(comp_id, PRIORITY_BROWSE)
             except Exception as e:
-                print(f"❌ Failed to extract {zf}: {e}")
+                print(f"⚠️ Snapshot refresh failed for {comp_id}: {e}")
 
-        # 4) Find CSV
-        csv_files = [f for f in os.listdir(latest_dir) if f.endswith(".csv")]
-        if not csv_files:
-            print(f"❌ No CSV found after extraction in {latest_dir}")
-            return 0.0, 0.0, 1.0
+    @snapshot_leaderboards.before_loop
+    async def _before_snapshots(self):
+        await self.bot.wait_until_ready()
 
-        csv_path = os.path.join(latest_dir, csv_files[0])
-        print(f"📄 Found leaderboard CSV: {csv_path}")
+    async def fetch_kaggle_scores_at(self, comp_id, expiries, strict: bool = False,
+                                     priority: int = PRIORITY_FREEZE):
+        """
+        Like fetch_kaggle_scores, but each user's score is taken as of their own unix time,
+        answered from the snapshot store. `expiries` is {discord_id: when}.
+        Users we have no snapshot for (or whose time is now-ish while the newest snapshot is
+        older than the cache TTL) are resolved together from one live leaderboard.
+        """
+        ids = {str(d): when for d, when in expiries.items()}
+        results = {uid: (0.0, 0.0, 1.0) for uid in ids}
+        kaggle_ids = self.links.kaggle_ids(ids)
+        stored = await self.snapshots.scores_as_of(comp_id, {kaggle_ids[uid]: ids[uid] for uid in kaggle_ids})
 
-        # 5) Get Kaggle ID
-        conn = sqlite3.connect("data/kaggle.db")
-        c = conn.cursor()
-        c.execute("SELECT kaggle_id FROM kaggle_links WHERE discord_id = ?", (str(discord_id),))
-        row = c.fetchone()
-        conn.close()
+        now = time.time()
+        need_live = []
+        for uid, kaggle_id in kaggle_ids.items():
+            hit = stored.get(kaggle_id)
+            live = now - ids[uid] < self.leaderboards.ttl
+            if hit is None or (live and hit[1] > self.leaderboards.ttl):
+                need_live.append(uid)
+                continue
+            scores, staleness = hit
+            if staleness >= 60:
+                print(f"🕰️ Using {comp_id} snapshot {staleness/60:.1f}m older than requested time for {uid}")
+            results[uid] = scores
 
-        if not row:
-            print(f"⚠️ No Kaggle ID linked for Discord user {discord_id}")
-            return 0.0, 0.0, 1.0
-        kaggle_id = (row[0] or "").strip().lower()
+        if need_live:
+            results.update(await self.fetch_kaggle_scores(comp_id, need_live, strict=strict, priority=priority))
+        return results
 
-        # 6) Parse leaderboard → user_score, min_score, max_score
-        user_score = 0.0
-        min_score = float("inf")
-        max_score = float("-inf")
+    async def fetch_kaggle_score(self, comp_id, discord_id: int, strict: bool = False,
+                                 priority: int = PRIORITY_JOIN):
+        """
+        Return (user_score, min_score, max_score) for this Discord user on comp_id's leaderboard.
+        """
+        scores = await self.fetch_kaggle_scores(comp_id, [discord_id], strict=strict, priority=priority)
+        user_score, min_score, max_score = scores[str(discord_id)]
+        print(f"✅ {discord_id} score={user_score}, min={min_score}, max={max_score}")
+        return user_score, min_score, max_score
 
-        try:
-            with open(csv_path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for r in reader:
-                    # Normalize columns to lowercase
-                    cols = { (k or "").strip().lower(): (v or "").strip() for k, v in r.items() }
-
-                    # Score
-                    score_raw = cols.get("score", "")
-                    try:
-                        score = float(score_raw)
-                    except Exception:
-                        continue
-
-                    # Track min/max
-                    if score < min_score:
-                        min_score = score
-                    if score > max_score:
-                        max_score = score
-
-                    # team/user columns (Kaggle CSV can vary)
-                    members_field = (
-                        cols.get("teammemberusernames")
-                        or cols.get("team member usernames")
-                        or cols.get("username")
-                        or ""
-                    )
-                    team_name = cols.get("teamname", "")
-
-                    members = [m.strip().lower() for m in members_field.split(",") if m.strip()]
-                    if kaggle_id in members or kaggle_id == team_name.lower():
-                        user_score = score
-
-            # Fallbacks if CSV was weird/empty
-            if min_score == float("inf"):
-                min_score = user_score
-            if max_score == float("-inf"):
-                max_score = user_score
-
-            print(f"✅ {kaggle_id} score={user_score}, min={min_score}, max={max_score}")
-            return user_score, min_score, max_score
-        except Exception as e:
-            print(f"❌ Failed to parse leaderboard CSV: {e}")
-            return 0.0, 0.0, 1.0
+    async def resolve_problems(self, problems, fetch):
+        """
+        Run `await fetch(comp_id)` for every problem concurrently, at most PROBLEM_FETCH_CONCURRENCY
+        at a time for this call and each bounded by PROBLEM_FETCH_TIMEOUT, so a multi-problem
+        competition costs about one download's latency. The bound is per call: callers don't queue
+        behind each other here (a freeze never waits on joins), the rate limiter orders them.
+        Returns (results, failed): {comp_id: result} and {comp_id: reason} for the ones that didn't make it.
+        """
+        slots = asyncio.Semaphore(PROBLEM_FETCH_CONCURRENCY)
+
+        async def _one(comp_id):
+            async with slots:
+                return await asyncio.wait_for(fetch(comp_id), timeout=PROBLEM_FETCH_TIMEOUT)
+
+        outcomes = await asyncio.gather(*(_one(comp_id) for comp_id in problems), return_exceptions=True)
+        results, failed = {}, {}
+        for comp_id, outcome in zip(problems, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                failed[comp_id] = f"timed out after {PROBLEM_FETCH_TIMEOUT:.0f}s"
+            elif isinstance(outcome, Exception):
+                failed[comp_id] = str(outcome) or type(outcome).__name__
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results[comp_id] = outcome
+        for comp_id, reason in failed.items():
+            print(f"⚠️ Could not resolve scores for {comp_id}: {reason}")
+        return results, failed
+
+    @staticmethod
+    def _describe_failures(failed) -> str:
+        return ", ".join(f"`{comp_id}` ({reason})" for comp_id, reason in failed.items())
 
     # ------------------ Commands ------------------
     @commands.group(name="comp", invoke_without_command=True)
@@ -307,7 +391,8 @@ class CompetitionCog(commands.Cog):
             ";competition leaderboard <weekly/biweekly/monthly>\n"
             "Only ADMIN commands:\n"
             ";competition kick <type> <member>\n"
-            ";competition forcejoin <type> <member>"
+            ";competition forcejoin <type> <member>\n"
+            ";competition stats\n"
             ";competition make <weekly/biweekly/monthly> <thread_name> <duration_minutes> <direction> <baseline> <problem_links>\n"
         )
 
@@ -392,6 +477,7 @@ class CompetitionCog(commands.Cog):
         self.active_comps[comp_type] = {
             "thread_id": comp_thread.id,
             "discussion_id": discussion_thread.id if discussion_thread else None,
+            "guild_id": ctx.guild.id,
             "name": thread_name,
             "duration": duration_minutes,
             "direction": direction,
@@ -410,7 +496,8 @@ class CompetitionCog(commands.Cog):
             "baseline": baseline,
             "problems": problems,
             "thread_id": comp_thread.id,
-            "discussion_id": discussion_thread.id if discussion_thread else None
+            "discussion_id": discussion_thread.id if discussion_thread else None,
+            "guild_id": ctx.guild.id
         }
 
         json_path = os.path.join("data", "competitions_jsons", f"{comp_type}.json")
@@ -428,43 +515,87 @@ class CompetitionCog(commands.Cog):
             await ctx.send("❌ No active competition.")
             return
 
+        uid = str(ctx.author.id)
+        # Only the reservation happens under the lock; leaderboards and Discord calls happen outside
+        # it, so a burst of joins doesn't queue up behind each other's downloads
         async with comp["lock"]:
-            if str(ctx.author.id) in comp["participants"]:
+            if uid in comp["participants"]:
                 await ctx.send("❌ You already joined this competition.")
                 return
+            if (comp_type, uid) in self._joining:
+                await ctx.send("⏳ Your join is already being processed.")
+                return
+            self._joining.add((comp_type, uid))
 
-            comp_thread = ctx.guild.get_thread(comp["thread_id"])
-            if comp_thread:
-                try:
-                    await comp_thread.add_user(ctx.author)
-                except Exception:
-                    pass
-
-            baselines = {}
-            for comp_id in comp["problems"]:
-                user_score, min_s, max_s = await self.fetch_kaggle_score(comp_id, ctx.author.id)
-                # Baseline is your current leaderboard score at join time
-                baselines[comp_id] = comp["baseline"]
-                self.save_participant(str(ctx.author.id), comp_type, comp_id, user_score, True)
+        try:
+            # Every problem's score is needed before we record anything
+            scores, failed = await self.resolve_problems(
+                comp["problems"], lambda comp_id: self.fetch_kaggle_score(comp_id, ctx.author.id, strict=True)
+            )
+            if failed:
+                await ctx.send(
+                    f"⚠️ Couldn't fetch leaderboards for {self._describe_failures(failed)}. "
+                    f"You have not been joined; please try again in a bit."
+                )
+                return
 
-            comp["participants"][str(ctx.author.id)] = {"baseline": baselines, "active": True, "joined_at": time.time()}
-            await ctx.send(f"✅ {ctx.author.display_name} joined {comp['name']}.")
+            joined_at = time.time()
+            await self.save_participant(uid, comp_type, {comp_id: score[0] for comp_id, score in scores.items()}, joined_at)
+            if self.active_comps.get(comp_type) is not comp:
+                # Ended while we were fetching/writing; don't leave rows behind
+                await self.remove_participant(uid, comp_type)
+                await ctx.send("❌ That competition ended while you were joining.")
+                return
 
-            # Timer
-            async def timer_task(user_id_str: str):
-                await asyncio.sleep(comp["duration"] * 60)
-                await self.freeze_participant(ctx.guild, comp_type, user_id_str)
+            # Baseline is the competition baseline for every problem
+            pdata = {
+                "baseline": {comp_id: comp["baseline"] for comp_id in comp["problems"]},
+                "active": True,
+                "joined_at": joined_at,
+            }
+            comp["participants"][uid] = pdata
+            self.scheduler.schedule(comp_type, uid, self._expires_at(comp, pdata))
+        except Exception as e:
+            print(f"❌ Join of {uid} to {comp_type} failed: {e}")
+            if uid not in comp["participants"]:
+                await self.remove_participant(uid, comp_type)
+            await ctx.send("❌ Something went wrong while joining; please try again.")
+            return
+        finally:
+            self._joining.discard((comp_type, uid))
 
-            asyncio.create_task(timer_task(str(ctx.author.id)))
+        comp_thread = ctx.guild.get_thread(comp["thread_id"])
+        if comp_thread:
+            try:
+                await comp_thread.add_user(ctx.author)
+            except Exception:
+                pass
+        await ctx.send(f"✅ {ctx.author.display_name} joined {comp['name']}.")
 
     # ----- Leaderboard -----
     @competition.command(name="leaderboard")
     async def leaderboard(self, ctx, comp_type: str):
-        comp = self.active_comps.get(comp_type.lower())
+        comp_type = comp_type.lower()
+        comp = self.active_comps.get(comp_type)
         if not comp:
             await ctx.send("❌ No active competition.")
             return
 
+        # Resolve every active participant from one snapshot per problem
+        active_ids = [uid for uid, pdata in comp["participants"].items() if pdata["active"]]
+        live_scores = {}
+        if active_ids:
+            for comp_id in comp["problems"]:
+                live_scores[comp_id] = await self.fetch_kaggle_scores(comp_id, active_ids)
+        kaggle_ids = self.links.kaggle_ids(comp["participants"].keys())
+
+        # Frozen participants come pre-aggregated from the standings table in one read
+        frozen = await self.db.fetchall(
+            "SELECT user_id, norm_sum, scores FROM standings WHERE comp_type=? AND active=0 ORDER BY norm_sum DESC",
+            (comp_type,)
+        )
+        frozen = {uid: (norm_sum, json.loads(scores)) for uid, norm_sum, scores in frozen}
+
         rows = []
         for uid_str, pdata in comp["participants"].items():
             uid = int(uid_str)
@@ -472,37 +603,23 @@ class CompetitionCog(commands.Cog):
             name = member.display_name if member else f"Unknown({uid_str})"
 
             # get kaggle id (for display)
-            conn = sqlite3.connect("data/kaggle.db")
-            c = conn.cursor()
-            c.execute("SELECT kaggle_id FROM kaggle_links WHERE discord_id=?", (uid_str,))
-            row = c.fetchone()
-            conn.close()
-            kaggle_id = row[0] if row else "?"
+            kaggle_id = kaggle_ids.get(uid_str) or "?"
 
             total_norm = 0.0
             detail = []
-            for comp_id in comp["problems"]:
-                if pdata["active"]:
-                    user_score, min_s, max_s = await self.fetch_kaggle_score(comp_id, uid)
+            if not pdata["active"]:
+                # use frozen values
+                total_norm, frozen_scores = frozen.get(uid_str, (0.0, {}))
+                for comp_id in comp["problems"]:
+                    user_score, norm = frozen_scores.get(comp_id, (0.0, 0.0))
+                    detail.append(f"{norm:.1f} ({user_score:.4f})")
+            else:
+                for comp_id in comp["problems"]:
+                    user_score, min_s, max_s = live_scores[comp_id][uid_str]
                     baseline = comp["baseline"]
                     norm = self._compute_norm(comp["direction"], baseline, user_score, min_s, max_s)
-                else:
-                    # use frozen values
-                    conn = sqlite3.connect(DB_FILE)
-                    c = conn.cursor()
-                    c.execute(
-                        "SELECT score, norm_score FROM frozen_scores WHERE user_id=? AND comp_type=? AND comp_id=?",
-                        (uid_str, comp_type, comp_id)
-                    )
-                    row = c.fetchone()
-                    conn.close()
-                    if row:
-                        user_score, norm = row
-                    else:
-                        user_score, norm = 0.0, 0.0
-
-                total_norm += norm
-                detail.append(f"{norm:.1f} ({user_score:.4f})")
+                    total_norm += norm
+                    detail.append(f"{norm:.1f} ({user_score:.4f})")
 
             rows.append((name, kaggle_id, total_norm, detail))
 
@@ -518,40 +635,18 @@ class CompetitionCog(commands.Cog):
         await ctx.send(msg)
 
     @competition.command(name="time")
-    async def competition_time(self, ctx, comp_type: str):
-        """Show remaining time for active participants."""
-        import time
+    async def competition_time(self, ctx, comp_type: str, limit: int = 20):
+        """Show remaining time for the active participants whose timers end soonest."""
         comp_type = comp_type.lower()
         comp = self.active_comps.get(comp_type)
         if not comp:
             await ctx.send("❌ No active competition found.")
             return
 
-        duration_sec = comp["duration"] * 60
         lines = []
         now = time.time()
-
-        for uid_str, pdata in comp["participants"].items():
-            if not pdata.get("active"):
-                continue
-            joined_at = pdata.get("joined_at")
-            if not joined_at:
-                # fallback: fetch from DB
-                conn = sqlite3.connect(DB_FILE)
-                c = conn.cursor()
-                c.execute(
-                    "SELECT joined_at FROM participants WHERE user_id=? AND comp_type=? LIMIT 1",
-                    (uid_str, comp_type)
-                )
-                row = c.fetchone()
-                conn.close()
-                if row and row[0]:
-                    joined_at = row[0]
-                else:
-                    continue
-
-            elapsed = now - joined_at
-            remaining = max(0, duration_sec - elapsed)
+        for expires_at, _, uid_str in self.scheduler.upcoming(comp_type, max(1, min(limit, 50))):
+            remaining = max(0, expires_at - now)
             m, s = divmod(int(remaining), 60)
             member = ctx.guild.get_member(int(uid_str))
             name = member.display_name if member else uid_str
@@ -565,6 +660,36 @@ class CompetitionCog(commands.Cog):
         await ctx.send(msg)
 
     # ----- Admin Overrides -----
+    @competition.command(name="stats")
+    @commands.has_permissions(administrator=True)
+    async def leaderboard_stats(self, ctx):
+        """Show how much leaderboard download/parse work the caches are saving, and Kaggle API load."""
+        st = self.downloader.stats
+        lookups = st["cache_hits"] + st["downloads"]
+        reused = st["cache_hits"] + st["unchanged"]
+        saved = (reused / lookups * 100.0) if lookups else 0.0
+        await ctx.send(
+            "```\n"
+            f"Leaderboard lookups : {lookups}\n"
+            f"Served from cache   : {st['cache_hits']}\n"
+            f"Downloads           : {st['downloads']} ({st['failed']} failed)\n"
+            f"Unchanged (reused)  : {st['unchanged']}\n"
+            f"Parsed              : {st['parsed']}\n"
+            f"Parses avoided      : {saved:.1f}%\n"
+            "```"
+        )
+
+        limiter = get_kaggle_limiter()
+        lst = limiter.stats
+        depth = limiter.queue_depth()
+        granted = sum(lst["granted"].values())
+        lines = [f"{'Kaggle API':<20}: {granted} call(s), {lst['waited'] / granted if granted else 0.0:.2f}s avg wait"]
+        for priority, name in sorted(PRIORITY_NAMES.items()):
+            lines.append(f"  {name:<18}: {lst['granted'][name]} granted, {depth[name]} queued")
+        lines.append(f"{'Max queue depth':<20}: {lst['max_depth']}")
+        lines.append(f"{'Retries':<20}: {lst['retries']} ({lst['throttled']} throttled, {lst['gave_up']} gave up)")
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
     @competition.command(name="kick")
     @commands.has_permissions(administrator=True)
     async def kick_participant(self, ctx, comp_type: str, member: discord.Member):
@@ -587,7 +712,9 @@ class CompetitionCog(commands.Cog):
                 pass
 
         del comp["participants"][uid_str]
-        self.remove_participant(uid_str, comp_type)
+        self.scheduler.cancel(comp_type, uid_str)
+        self._freeze_attempts.pop((comp_type, uid_str), None)
+        await self.remove_participant(uid_str, comp_type)
         await ctx.send(f"🗑️ {member.display_name} has been removed from {comp['name']}.")
 
     @competition.command(name="forcejoin")
@@ -599,6 +726,16 @@ class CompetitionCog(commands.Cog):
             await ctx.send("❌ No active competition.")
             return
 
+        scores, failed = await self.resolve_problems(
+            comp["problems"], lambda comp_id: self.fetch_kaggle_score(comp_id, member.id, strict=True)
+        )
+        if failed:
+            await ctx.send(
+                f"⚠️ Couldn't fetch leaderboards for {self._describe_failures(failed)}. "
+                f"{member.display_name} was not added."
+            )
+            return
+
         comp_thread = ctx.guild.get_thread(comp["thread_id"])
         if comp_thread:
             try:
@@ -606,13 +743,13 @@ class CompetitionCog(commands.Cog):
             except Exception:
                 pass
 
-        baselines = {}
-        for comp_id in comp["problems"]:
-            user_score, min_s, max_s = await self.fetch_kaggle_score(comp_id, member.id)
-            baselines[comp_id] = user_score
-            self.save_participant(str(member.id), comp_type, comp_id, user_score, True)
+        baselines = {comp_id: user_score for comp_id, (user_score, min_s, max_s) in scores.items()}
+        joined_at = time.time()
+        await self.save_participant(str(member.id), comp_type, baselines, joined_at)
 
-        comp["participants"][str(member.id)] = {"baseline": baselines, "active": True}
+        pdata = {"baseline": baselines, "active": True, "joined_at": joined_at}
+        comp["participants"][str(member.id)] = pdata
+        self.scheduler.schedule(comp_type, str(member.id), self._expires_at(comp, pdata))
         await ctx.send(f"✅ {member.display_name} was forcibly added to {comp['name']} by an admin.")
 
     @competition.command(name="end")
@@ -639,17 +776,22 @@ class CompetitionCog(commands.Cog):
                     pass
 
         # Remove DB entries
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        try:
-            c.execute("DELETE FROM participants WHERE comp_type=?", (comp_type,))
-            c.execute("DELETE FROM frozen_scores WHERE comp_type=?", (comp_type,))
-            conn.commit()
-        finally:
-            conn.close()
+        def _delete_comp(conn):
+            conn.execute("DELETE FROM participants WHERE comp_type=?", (comp_type,))
+            conn.execute("DELETE FROM frozen_scores WHERE comp_type=?", (comp_type,))
+            conn.execute("DELETE FROM standings WHERE comp_type=?", (comp_type,))
+        await self.db.transaction(_delete_comp)
 
         # Remove from memory
         del self.active_comps[comp_type]
+        self.scheduler.cancel_comp(comp_type)
+        self._freeze_attempts = {k: v for k, v in self._freeze_attempts.items() if k[0] != comp_type}
+
+        # Drop leaderboard history no other competition needs
+        still_used = {cid for other in self.active_comps.values() for cid in other["problems"]}
+        for comp_id in set(comp["problems"]) - still_used:
+            self.leaderboards.invalidate(comp_id)
+            await self.snapshots.prune(comp_id)
 
         # 5️⃣ Delete saved JSON file
         json_path = os.path.join("data", "competitions_jsons", f"{comp_type}.json")
@@ -669,57 +811,127 @@ class CompetitionCog(commands.Cog):
     
     async def freeze_participant(self, guild, comp_type: str, user_id_str: str):
         """Freeze a participant manually (for expired timers or recovery)."""
+        await self.freeze_participants(guild, comp_type, [user_id_str])
+
+    async def freeze_participants(self, guild, comp_type: str, user_ids):
+        """
+        Freeze a batch of participants of one competition (expired timers or recovery).
+        Scores for everyone are resolved per problem in one go, frozen_scores and the
+        participants.active flags are written in a single transaction, then Discord is updated.
+        guild=None means the competition's own guild.
+        """
         comp = self.active_comps.get(comp_type)
         if not comp:
             return
 
-        user_id = int(user_id_str)
-        member = guild.get_member(user_id)
+        users = {}
+        for user_id_str in user_ids:
+            user_data = comp["participants"].get(user_id_str)
+            if not user_data:
+                print(f"⚠️ No participant data for {user_id_str} in {comp_type}, skipping freeze.")
+                continue
+            if not user_data.get("active"):
+                continue
+            users[user_id_str] = user_data
+        if not users:
+            return
 
-        # 1) Unlock discussion and add user
+        # 1) Resolve scores as of the moment each timer ran out
+        now = time.time()
+        expiries = {
+            uid: min(data["joined_at"] + comp["duration"] * 60, now) if data.get("joined_at") else now
+            for uid, data in users.items()
+        }
+        scores, failed = await self.resolve_problems(
+            comp["problems"], lambda comp_id: self.fetch_kaggle_scores_at(comp_id, expiries, strict=True)
+        )
+        # Resolving can take minutes; drop anyone kicked (or already frozen) meanwhile, and
+        # everything if the competition was ended or replaced
+        if self.active_comps.get(comp_type) is not comp:
+            return
+        users = {
+            uid: user_data for uid, user_data in users.items()
+            if comp["participants"].get(uid) is user_data and user_data.get("active")
+        }
+        if not users:
+            return
+        if failed:
+            # Try again shortly rather than freezing zeros; the snapshot store still answers
+            # "as of expiry" once the leaderboard is reachable again
+            retry = [uid for uid in users if self._freeze_attempts.get((comp_type, uid), 0) < FREEZE_MAX_RETRIES]
+            for uid in retry:
+                self._freeze_attempts[(comp_type, uid)] = self._freeze_attempts.get((comp_type, uid), 0) + 1
+                self.scheduler.schedule(comp_type, uid, now + FREEZE_RETRY_DELAY)
+                del users[uid]
+            if retry:
+                print(f"🔁 Retrying freeze of {len(retry)} participant(s) in {comp_type} in {FREEZE_RETRY_DELAY:.0f}s")
+            if not users:
+                return
+            print(f"⚠️ Out of retries; freezing {len(users)} participant(s) in {comp_type} "
+                  f"without {self._describe_failures(failed)}")
+            for comp_id in failed:
+                scores[comp_id] = {uid: (0.0, 0.0, 1.0) for uid in users}
+        for uid in users:
+            self._freeze_attempts.pop((comp_type, uid), None)
+
+        # 2) Freeze and record scores, mark inactive — one transaction
+        frozen = []
+        standings = []
+        for uid, user_data in users.items():
+            user_scores = {}
+            for comp_id in comp["problems"]:
+                user_score, min_s, max_s = scores[comp_id][uid]
+                baseline = user_data["baseline"].get(comp_id, comp["baseline"])
+                norm = self._compute_norm(comp["direction"], baseline, user_score, min_s, max_s)
+                frozen.append((uid, comp_type, comp_id, user_score, norm))
+                user_scores[comp_id] = [user_score, norm]
+            standings.append((comp_type, uid, sum(v[1] for v in user_scores.values()), json.dumps(user_scores)))
+
+        def _freeze(conn):
+            conn.executemany("REPLACE INTO frozen_scores VALUES (?, ?, ?, ?, ?)", frozen)
+            conn.executemany("REPLACE INTO standings VALUES (?, ?, 0, ?, ?)", standings)
+            conn.executemany("UPDATE participants SET active=0 WHERE user_id=? AND comp_type=?",
+                             [(uid, comp_type) for uid in users])
+        await self.db.transaction(_freeze)
+        for user_data in users.values():
+            user_data["active"] = False
+
+        # 3) Unlock discussion and add users
+        guild = guild or self._comp_guild(comp)
+        if guild is None:
+            print(f"⚠️ Guild of {comp_type} not found; froze {len(users)} participant(s) without updating threads")
+            return
+        members = {uid: guild.get_member(int(uid)) for uid in users}
         discussion_thread = guild.get_thread(comp["discussion_id"])
         if discussion_thread:
             try:
                 await discussion_thread.edit(locked=False)
-                if member:
-                    await discussion_thread.add_user(member)
-                await discussion_thread.send(f"⏰ <@{user_id_str}>, your time ended. Scores frozen.")
             except Exception as e:
-                print(f"⚠️ Discussion unlock failed during recovery: {e}")
+                print(f"⚠️ Discussion unlock failed during freeze: {e}")
+            for uid, member in members.items():
+                if member:
+                    try:
+                        await discussion_thread.add_user(member)
+                    except Exception as e:
+                        print(f"⚠️ Could not add {uid} to discussion thread: {e}")
+            # One announcement per batch (kept under Discord's 2000 char limit)
+            mentions = [f"<@{uid}>" for uid in users]
+            for i in range(0, len(mentions), 50):
+                try:
+                    await discussion_thread.send(f"⏰ {', '.join(mentions[i:i+50])}, your time ended. Scores frozen.")
+                except Exception as e:
+                    print(f"⚠️ Discussion announcement failed during freeze: {e}")
 
-        # 2) Remove from main thread
+        # 4) Remove from main thread
         comp_thread = guild.get_thread(comp["thread_id"])
-        if comp_thread and member:
-            try:
-                await comp_thread.remove_user(member)
-            except Exception as e:
-                print(f"⚠️ Could not remove {user_id_str} from comp thread: {e}")
-
-        # 3) Freeze and record scores
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        for comp_id in comp["problems"]:
-            user_score, min_s, max_s = await self.fetch_kaggle_score(comp_id, user_id)
-            user_data = comp["participants"].get(user_id_str)
-            if not user_data:
-                print(f"⚠️ No participant data for {user_id_str} in {comp_type}, skipping freeze.")
-                return
-
-            baseline = user_data["baseline"].get(comp_id, comp["baseline"])
-            norm = self._compute_norm(comp["direction"], baseline, user_score, min_s, max_s)
-            c.execute("REPLACE INTO frozen_scores VALUES (?, ?, ?, ?, ?)",
-                    (user_id_str, comp_type, comp_id, user_score, norm))
-        conn.commit()
-        conn.close()
-
-        # 4) Mark inactive
-        comp["participants"][user_id_str]["active"] = False
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("UPDATE participants SET active=0 WHERE user_id=? AND comp_type=?",
-                (user_id_str, comp_type))
-        conn.commit()
-        conn.close()
+        if comp_thread:
+            for uid, member in members.items():
+                if not member:
+                    continue
+                try:
+                    await comp_thread.remove_user(member)
+                except Exception as e:
+                    print(f"⚠️ Could not remove {uid} from comp thread: {e}")
 
 async def setup(bot):
     await bot.add_cog(CompetitionCog(bot))
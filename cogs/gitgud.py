@@ -1,16 +1,75 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+import math
 import os
 import random
+import time
 from kaggle import api  # Official Kaggle API client
 
+from utils.catalog import CATALOG_REFRESH_INTERVAL, KaggleCatalog
+from utils.paging import PageView
+
+SEARCH_RESULTS = 50  # ranked matches kept per ;gitgud search
+SEARCH_PER_PAGE = 10
+
 class GitGud(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.kaggle_username = os.getenv("KAGGLE_USERNAME")
         self.kaggle_key = os.getenv("KAGGLE_KEY")
+        # Every Kaggle competition, persisted under data/ and refreshed in the background
+        self.catalog = KaggleCatalog(api.competitions_list)
+        self.refresh_catalog.start()
+
+    def cog_unload(self):
+        self.refresh_catalog.cancel()
+
+    @tasks.loop(seconds=CATALOG_REFRESH_INTERVAL)
+    async def refresh_catalog(self):
+        if not self.kaggle_username or not self.kaggle_key:
+            return
+        try:
+            await self.catalog.refresh()
+        except Exception as e:
+            print(f"⚠️ Kaggle catalog refresh failed: {e}")
 
-    @commands.command(name="gitgud")
+    @refresh_catalog.before_loop
+    async def _before_refresh(self):
+        await self.bot.wait_until_ready()
+
+    async def _ensure_catalog(self, ctx) -> bool:
+        """First run: nothing on disk yet, so build the catalog once. False if we can't."""
+        if self.catalog:
+            return True
+        if not self.kaggle_username or not self.kaggle_key:
+            await ctx.send("❌ Kaggle API credentials not configured properly.")
+            return False
+        await ctx.send("📚 Building the Kaggle competition catalog, this only happens once...")
+        await self.catalog.refresh()
+        return True
+
+    @staticmethod
+    def _parse_filters(args, status="active"):
+        """Split `key=value` filters from free words. Returns (category, status, tags, words)."""
+        category = None
+        tags = []
+        words = []
+        for f in args:
+            if "=" in f:
+                key, value = f.split("=", 1)
+                key = key.lower().strip()
+                value = value.lower().strip()
+                if key == "category":
+                    category = value
+                elif key == "tag":
+                    tags.append(value)
+                elif key == "status" and value in ("active", "closed", "all"):
+                    status = value
+            else:
+                words.append(f)
+        return category, status, tags, words
+
+    @commands.group(name="gitgud", invoke_without_command=True)
     async def gitgud(self, ctx, *filters):
         """
         Fetch a random Kaggle competition with optional filters.
@@ -20,38 +79,20 @@ class GitGud(commands.Cog):
           ;gitgud category=featured
           ;gitgud tag=nlp
           ;gitgud category=playground tag=vision
+          ;gitgud status=closed
+          ;gitgud search <keywords>
         """
 
-        if not self.kaggle_username or not self.kaggle_key:
-            await ctx.send("❌ Kaggle API credentials not configured properly.")
-            return
-
         try:
             # --- Parse filters ---
-            params = {}
-            tags = []
-            for f in filters:
-                if "=" in f:
-                    key, value = f.split("=", 1)
-                    key = key.lower().strip()
-                    value = value.lower().strip()
-                    if key == "category":
-                        params["category"] = value
-                    elif key == "tag":
-                        tags.append(value)
-
-            # --- Fetch competitions ---
-            competitions = api.competitions_list(**params)
-
-            # --- Manual tag filter (title/description) ---
-            if tags:
-                competitions = [
-                    c for c in competitions
-                    if any(
-                        t in (c.title.lower() + (c.description or "").lower())
-                        for t in tags
-                    )
-                ]
+            category, status, tags, _ = self._parse_filters(filters)
+
+            if not await self._ensure_catalog(ctx):
+                return
+
+            # --- Pick from the local catalog; tags go through the keyword index ---
+            refs = self.catalog.index().matching(" ".join(tags)) if tags else None
+            competitions = self.catalog.find(category=category, status=status, refs=refs)
 
             if not competitions:
                 await ctx.send("⚠️ No competitions found for those filters.")
@@ -60,27 +101,77 @@ class GitGud(commands.Cog):
             # --- Pick one ---
             comp = random.choice(competitions)
 
-            # --- Build URL ---
-            url = f"{comp.ref}"
-
             # --- Create embed ---
             embed = discord.Embed(
-                title=comp.title,
-                url=url,
-                description=(comp.description or "No description available."),
+                title=comp["title"],
+                url=comp["url"],
+                description=(comp.get("description") or "No description available."),
                 color=discord.Color.blue()
             )
 
-            embed.add_field(name="Category", value=getattr(comp, "category", "N/A") or "N/A", inline=True)
-            embed.add_field(name="Reward", value=getattr(comp, "reward", "N/A") or "N/A", inline=True)
-            embed.add_field(name="Deadline", value=getattr(comp, "deadline", "N/A") or "N/A", inline=False)
-            embed.add_field(name="Organization", value=getattr(comp, "organization_name", "N/A") or "N/A", inline=False)
-            embed.set_footer(text="Fetched from Kaggle")
+            embed.add_field(name="Category", value=comp.get("category") or "N/A", inline=True)
+            embed.add_field(name="Reward", value=comp.get("reward") or "N/A", inline=True)
+            embed.add_field(name="Deadline", value=comp.get("deadline") or "N/A", inline=False)
+            embed.add_field(name="Organization", value=comp.get("organization") or "N/A", inline=False)
+            age = (time.time() - self.catalog.updated_at) / 3600
+            embed.set_footer(text=f"From Kaggle, catalog of {len(self.catalog)} competitions updated {age:.0f}h ago")
 
             await ctx.send(embed=embed)
 
         except Exception as e:
             await ctx.send(f"⚠️ Something went wrong: `{type(e).__name__}: {e}`")
 
+    @gitgud.command(name="search")
+    async def gitgud_search(self, ctx, *query):
+        """
+        Ranked keyword search over every Kaggle competition.
+
+        Usage:
+          ;gitgud search time series forecasting
+          ;gitgud search image segmentation status=active
+          ;gitgud search tabular category=playground
+        """
+        category, status, tags, words = self._parse_filters(query, status="all")
+        text = " ".join(words + tags)
+        if not text.strip():
+            await ctx.send("❌ Usage: `;gitgud search <keywords> [category=<type>] [status=<active|closed|all>]`")
+            return
+        if not await self._ensure_catalog(ctx):
+            return
+
+        started = time.perf_counter()
+        index = self.catalog.index()
+        allowed = None
+        if category or status != "all":
+            allowed = {c["ref"] for c in self.catalog.find(category=category, status=status)}
+        results = index.search(text, limit=SEARCH_RESULTS, allowed=allowed)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if not results:
+            await ctx.send(f"⚠️ No competitions match `{text}`.")
+            return
+
+        pages = math.ceil(len(results) / SEARCH_PER_PAGE)
+
+        def make_page(page_index):
+            start = page_index * SEARCH_PER_PAGE
+            lines = []
+            for rank, (score, ref) in enumerate(results[start:start + SEARCH_PER_PAGE], start=start + 1):
+                comp = self.catalog.competitions[ref]
+                lines.append(f"**{rank}. [{comp['title']}]({comp['url']})** · {comp.get('category') or 'N/A'}")
+            embed = discord.Embed(
+                title=f"🔎 Kaggle competitions matching “{text}”",
+                description="\n".join(lines),
+                color=discord.Color.blue()
+            )
+            embed.set_footer(text=f"Page {page_index+1}/{pages} · {len(results)} top matches in {elapsed_ms:.1f} ms")
+            return embed
+
+        if pages == 1:
+            await ctx.send(embed=make_page(0))
+            return
+        view = PageView(lambda page: {"embed": make_page(page)}, pages, ctx.author.id, ";gitgud search")
+        view.message = await ctx.send(embed=make_page(0), view=view)
+
 async def setup(bot):
     await bot.add_cog(GitGud(bot))
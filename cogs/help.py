@@ -18,7 +18,7 @@ HELPTABLE = {
                   "**Subcommands include:**\n"
                   "- `identify`\n- `verify`\n- `get`\n- `list`\n\n"
                   "ADMIN only command:\n"
-                  "- `unlink`"
+                  "- `unlink`\n- `reverify`"
         ),
         
         "identify": (
@@ -59,12 +59,23 @@ HELPTABLE = {
             "- Deletes the specified member’s record from the Kaggle database.\n"
         ),
 
+        "reverify": (
+            "⚙️ **Admin-only:** Re-check every linked Kaggle account against kaggle.com.\n\n"
+            "**Usage:** `;kaggle reverify` or `;kaggle reverify status`\n"
+            "**Permissions required:** `Manage Server`\n"
+            "**What it does:**\n"
+            "- Checks that each linked Kaggle profile still exists under the same username, a few at a time and behind member commands.\n"
+            "- Accounts that were deleted or renamed are marked unverified (⚠️); their owners can run `;kaggle identify` again.\n"
+            "- Shows live progress, then a summary. `status` shows the running check or the last report.\n"
+            "- Also runs automatically once a week, and resumes where it stopped if the bot restarts.\n"
+        ),
+
         "list": (
             "List all Discord members who have linked Kaggle IDs.\n\n"
             "**Usage:** `;kaggle list`\n"
             "**What it does:**\n"
             "- Displays all linked accounts with verification status.\n"
-            "- Shows up to 20 users per page and supports reaction-based page navigation. Use arrows to go forward and backwards.\n"
+            "- Shows up to 20 users per page, sorted by Discord name. Use the ◀ ▶ buttons to go backwards and forward.\n"
             "- Verified accounts show ✅, unverified show ⚠️.\n"
         )
     }
@@ -77,13 +88,13 @@ HELPTABLE = {
             "**Subcommands include:**\n"
             "- `join`\n- `leaderboard`\n- `time`\n\n"
             "ADMIN only command:\n"
-            "- `make`\n- `kick`\n- `forcejoin`\n- `end`"
+            "- `make`\n- `kick`\n- `forcejoin`\n- `end`\n- `stats`"
         ),
         "time": (
             "⏱️ Check how much time is left for currently active participants in a competition.\n\n"
-            "**Usage:** `;comp time <weekly/biweekly/monthly>`\n\n"
+            "**Usage:** `;comp time <weekly/biweekly/monthly> [count]`\n\n"
             "**What it does:**\n"
-            "- Shows a list of all participants who are still active (their timer hasn’t expired yet).\n"
+            "- Shows the active participants whose timers end soonest (20 by default, up to 50 with `count`).\n"
             "- Displays their **remaining time** in minutes and seconds.\n"
             "- Useful for admins to monitor ongoing competition progress, or for participants to confirm their remaining duration.\n\n"
             "**Example:**\n"
@@ -174,6 +185,15 @@ HELPTABLE = {
             "3. Removes the competition from memory.\n"
             "4. Deletes its saved JSON file from `data/competitions_jsons/`.\n\n"
             "**Example:** `;comp end weekly`"
+        ),
+
+        "stats": (
+            "📈 **Admin-only:** Show how much leaderboard work the bot is saving.\n\n"
+            "**Usage:** `;comp stats`\n\n"
+            "**What it shows:**\n"
+            "- How many leaderboard lookups were served from the cache vs. downloaded from Kaggle.\n"
+            "- How many downloads were identical to the previous one and reused without re-parsing.\n"
+            "- Failed downloads."
         )
     },
     "gitgud": {
@@ -183,11 +203,17 @@ HELPTABLE = {
             "Fetch and display a random Kaggle competition, optionally filtered by category or keyword tags.\n\n"
             "**Filters (optional):**\n"
             "- `category=<type>` — filter by Kaggle category (e.g. `featured`, `playground`, `research`, `recruitment`).\n"
-            "- `tag=<keyword>` — filter by topic keyword (e.g. `nlp`, `vision`, `finance`). You can include multiple tag filters. This is a bit clanky and is not perfect so we reccomend not using this.\n\n"
+            "- `tag=<keyword>` — filter by topic keyword (e.g. `nlp`, `vision`, `finance`), matched as a whole word in the title, description, category or Kaggle tags. You can include multiple tag filters.\n"
+            "- `status=<active|closed|all>` — running competitions (default), finished ones, or both.\n\n"
             "**Examples:**\n"
             "- `;gitgud` → Random competition from all categories.\n"
             "- `;gitgud category=featured` → Random competition from Kaggle’s Featured list.\n"
-            "- `;gitgud tag=nlp tag=transformers` → Random competition mentioning NLP or transformers. (Chances are that this fails)\n\n"
+            "- `;gitgud tag=nlp tag=transformers` → Random competition mentioning NLP or transformers.\n"
+            "- `;gitgud status=closed category=playground` → Random finished Playground competition to practice on.\n\n"
+            "**Search:** `;gitgud search <keywords> [category=<type>] [status=<active|closed|all>]`\n"
+            "Lists the best matching competitions, ranked by relevance, 10 per page (use ◀ ▶ to flip pages).\n"
+            "- `;gitgud search time series forecasting`\n"
+            "- `;gitgud search image segmentation status=active`\n\n"
             "**Output:**\n"
             "- An embedded card showing:\n"
             "  - Competition Title (with clickable Kaggle link)\n"
@@ -195,7 +221,8 @@ HELPTABLE = {
             "  - Category (e.g., Playground, Featured)\n"
             "  - Reward and Deadline (if available)\n"
             "  - Organizing institution name\n\n"
-            "- If filters yield no results, a message will inform you accordingly."
+            "- If filters yield no results, a message will inform you accordingly.\n\n"
+            "Competitions come from a local catalog of every Kaggle competition that refreshes itself every few hours."
         )
     },
     "chat": {
@@ -204,8 +231,13 @@ HELPTABLE = {
             "This Cog connects to **Google Gemini (model: gemini-2.5-flash-lite)** and lets you chat contextually — the bot remembers your recent messages in that channel.\n\n"
             "**How it works:**\n"
             "- Mention the bot (`@BotName`) followed by your message.\n"
-            "- It responds intelligently, using the last 20 messages in that channel as conversation context.\n"
-            "- Each channel has its own independent memory.\n\n"
+            "- It responds intelligently, using recent messages in that channel (plus a running summary of older ones) as conversation context.\n"
+            "- Each channel has its own independent memory, kept across bot restarts.\n"
+            "- Common standalone questions are answered instantly from a short-lived cache.\n"
+            "- When lots of people mention the bot at once, messages are answered in order; if the queue is full you'll be asked to try again.\n\n"
+            "ADMIN only commands:\n"
+            "- `;forget_here` clears this channel's memory, `;forget_all` clears everything (cached answers included).\n"
+            "- `;chat_stats` shows cache hit rate, queue and memory stats.\n\n"
             "**Example:**\n"
             "`@Bohrium how do I improve my Kaggle score?`\n"
             "→ The bot replies using Gemini’s reasoning and prior messages in the thread."
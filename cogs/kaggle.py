@@ -1,34 +1,175 @@
 import discord
-from discord.ext import commands
-import sqlite3
+from discord.ext import commands, tasks
+import asyncio
 import os
 import random
 import aiohttp
 import math
+import time
 
-DB_FILE = "data/kaggle.db"
+from utils.http import JsonCache, stream_contains
+from utils.links import get_link_directory
+from utils.names import LinkedNameIndex
+from utils.paging import OwnerView
+from utils.ratelimit import PRIORITY_BROWSE, KaggleRetryableError, get_kaggle_limiter
+from utils.reverify import REVERIFY_INTERVAL, ReverifyJob
 
 # Ensure data folder exists
 if not os.path.exists("data"):
     os.makedirs("data")
 
-# Setup database
-conn = sqlite3.connect(DB_FILE)
-c = conn.cursor()
-c.execute("""
-CREATE TABLE IF NOT EXISTS kaggle_links (
-    discord_id TEXT PRIMARY KEY,
-    kaggle_id TEXT UNIQUE,
-    verified INTEGER DEFAULT 0
-)
-""")
-conn.commit()
-conn.close()
+# discord_id <-> kaggle_id, loaded from data/kaggle.db once and kept in sync on every write
+links = get_link_directory()
+limiter = get_kaggle_limiter()
+# Profile JSON for ;kaggle get, revalidated with Kaggle once it's older than PROFILE_CACHE_TTL
+profile_cache = JsonCache()
+# Bulk re-check of every link; resumable, runs on a schedule and on demand
+reverify_job = ReverifyJob(links)
+
+LIST_PER_PAGE = 20
+
+
+class LinkListView(OwnerView):
+    """◀ ▶ buttons for ;kaggle list; each turn renders just the next/previous page of the name index."""
+
+    def __init__(self, index, author_id):
+        super().__init__(author_id, ";kaggle list")
+        self.index = index
+        self.keys, self.start = index.page_after(None, LIST_PER_PAGE)
+        self._sync_buttons()
+
+    def render(self) -> str:
+        lines = []
+        for _, discord_id in self.keys:
+            entry = links.get(discord_id)
+            kaggle_id, verified = entry if entry else ("(unlinked)", False)
+            name = self.index.label(discord_id)
+            check = "✅" if verified else "⚠️"
+            lines.append(f"{name:<20} | {kaggle_id:<20} {check}")
+
+        header = f"{'Discord Name':<20} | {'Kaggle ID':<20} Status"
+        content = "\n".join([header, "-"*50] + lines)
+        pages = max(math.ceil(len(self.index) / LIST_PER_PAGE), 1)
+        page = min(math.ceil(self.start / LIST_PER_PAGE) + 1, pages)
+        return f"```{content}```\nPage {page}/{pages}"
+
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.start == 0
+        self.next_page.disabled = self.start + len(self.keys) >= len(self.index)
+
+    async def _turn(self, interaction, keys, start):
+        if keys:
+            self.keys, self.start = keys, start
+        self._sync_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        cursor = self.keys[0] if self.keys else None
+        keys, start = self.index.page_before(cursor, LIST_PER_PAGE) if cursor else ([], 0)
+        await self._turn(interaction, keys, start)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        cursor = self.keys[-1] if self.keys else None
+        await self._turn(interaction, *self.index.page_after(cursor, LIST_PER_PAGE))
+
 
 class Kaggle(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.verification_codes = {}  # Temporary store {discord_id: code}
+        self.name_indexes = {}  # {guild_id: LinkedNameIndex}, built on first ;kaggle list
+        links.add_listener(self._on_link_change)
+        self.scheduled_reverify.start()
+
+    def cog_unload(self):
+        self.scheduled_reverify.cancel()
+        links.remove_listener(self._on_link_change)
+
+    # ---- sorted name index for ;kaggle list ----
+    def _name_index(self, guild):
+        index = self.name_indexes.get(guild.id)
+        if index is None:
+            index = self.name_indexes[guild.id] = LinkedNameIndex(guild, links)
+        return index
+
+    def _on_link_change(self, discord_id):
+        for index in self.name_indexes.values():
+            index.update(discord_id)
+
+    def _on_name_change(self, guild, user_id):
+        index = self.name_indexes.get(guild.id)
+        if index is not None and links.get(user_id) is not None:
+            index.update(user_id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.display_name != after.display_name:
+            self._on_name_change(after.guild, after.id)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before, after):
+        # Global name changes show up as display names wherever the member has no nickname
+        if before.display_name == after.display_name:
+            return
+        for guild_id in self.name_indexes:
+            guild = self.bot.get_guild(guild_id)
+            if guild is not None and guild.get_member(after.id) is not None:
+                self._on_name_change(guild, after.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        self._on_name_change(member.guild, member.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self._on_name_change(member.guild, member.id)
+
+    @tasks.loop(hours=1)
+    async def scheduled_reverify(self):
+        """Resume a run cut short by a restart, or start a new one once the last is REVERIFY_INTERVAL old."""
+        if reverify_job.running() or not links:
+            return
+        pending = await reverify_job.pending_run()
+        if pending:
+            reverify_job.start(pending[1])
+        elif time.time() - await reverify_job.last_finished_at() > REVERIFY_INTERVAL:
+            reverify_job.start("scheduled")
+
+    @scheduled_reverify.before_loop
+    async def _before_reverify(self):
+        await self.bot.wait_until_ready()
+
+    @staticmethod
+    def _reverify_progress():
+        p = reverify_job.progress
+        c = p["counts"]
+        return (f"🔄 Re-verifying Kaggle links: {p['done']}/{p['total']} — "
+                f"✅ {c['ok']} ok · ❓ {c['missing']} missing · 🔀 {c['renamed']} renamed · ⚠️ {c['error']} errors")
+
+    async def _reverify_report(self, ctx):
+        run, counts, problems = await reverify_job.report()
+        if run is None:
+            return "❌ No re-verification has run yet."
+        run_id, trigger, started_at, finished_at, total = run
+        state = "finished" if finished_at else "in progress"
+        lines = [
+            f"📋 Re-verification run #{run_id} ({trigger}), {state}: {sum(counts.values())}/{total} checked",
+            f"✅ {counts.get('ok', 0)} ok · ❓ {counts.get('missing', 0)} missing · "
+            f"🔀 {counts.get('renamed', 0)} renamed · ⚠️ {counts.get('error', 0)} errors (retried next run)",
+        ]
+        if problems:
+            lines.append("Marked unverified:")
+            for discord_id, kaggle_id, status, detail in problems:
+                member = ctx.guild.get_member(int(discord_id)) if ctx.guild else None
+                name = member.display_name if member else f"Unknown({discord_id})"
+                why = f"renamed to `{detail}`" if status == "renamed" else "profile not found"
+                lines.append(f"- {name}: `{kaggle_id}` {why}")
+            more = counts.get("missing", 0) + counts.get("renamed", 0) - len(problems)
+            if more > 0:
+                lines.append(f"...and {more} more")
+        return "\n".join(lines)
 
     @commands.group(invoke_without_command=True)
     async def kaggle(self, ctx):
@@ -38,14 +179,8 @@ class Kaggle(commands.Cog):
     @kaggle.command()
     async def identify(self, ctx, kaggle_id: str):
         """Begin Kaggle account verification process."""
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-
         # Prevent duplicate Kaggle IDs
-        c.execute("SELECT discord_id FROM kaggle_links WHERE kaggle_id = ?", (kaggle_id,))
-        row = c.fetchone()
-        if row:
-            conn.close()
+        if links.owner(kaggle_id) is not None:
             await ctx.send(f"⚠️ The Kaggle ID `{kaggle_id}` is already linked to another user.")
             return
 
@@ -53,8 +188,6 @@ class Kaggle(commands.Cog):
         code = f"SOTA-{random.randint(10000,99999)}"
         self.verification_codes[str(ctx.author.id)] = (kaggle_id, code)
 
-        conn.close()
-
         await ctx.send(
             f"📝 {ctx.author.mention}, to verify ownership of `{kaggle_id}`:\n"
             f"1. Go to your Kaggle profile.\n"
@@ -74,24 +207,21 @@ class Kaggle(commands.Cog):
 
         url = f"https://www.kaggle.com/{kaggle_id}"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    await ctx.send(f"⚠️ Could not fetch Kaggle profile for `{kaggle_id}`.")
-                    return
-                text = await resp.text()
+        # Stream the profile and stop at the code, rather than pulling the whole page into memory
+        try:
+            status, found = await limiter.call(PRIORITY_BROWSE, stream_contains, url, code)
+        except KaggleRetryableError:
+            await ctx.send("⏳ Kaggle is rate limiting us right now, try `;kaggle verify` again in a minute.")
+            return
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = None
+        if status != 200:
+            await ctx.send(f"⚠️ Could not fetch Kaggle profile for `{kaggle_id}`.")
+            return
 
-        if code in text:
+        if found:
             # Save verified link
-            conn = sqlite3.connect(DB_FILE)
-            c = conn.cursor()
-            c.execute("""
-                INSERT INTO kaggle_links (discord_id, kaggle_id, verified)
-                VALUES (?, ?, 1)
-                ON CONFLICT(discord_id) DO UPDATE SET kaggle_id=excluded.kaggle_id, verified=1
-            """, (discord_id, kaggle_id))
-            conn.commit()
-            conn.close()
+            await links.link(discord_id, kaggle_id, verified=True)
 
             del self.verification_codes[discord_id]
             await ctx.send(f"✅ {ctx.author.mention}, your Kaggle ID `{kaggle_id}` has been **verified** successfully!")
@@ -104,12 +234,7 @@ class Kaggle(commands.Cog):
         if member is None:
             member = ctx.author
 
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("SELECT kaggle_id, verified FROM kaggle_links WHERE discord_id = ?", (str(member.id),))
-        row = c.fetchone()
-        conn.close()
-
+        row = links.get(member.id)
         if not row:
             await ctx.send(f"❌ No Kaggle ID linked for {member.mention}")
             return
@@ -120,12 +245,19 @@ class Kaggle(commands.Cog):
 
         # Fetch Kaggle profile JSON
         api_url = f"https://www.kaggle.com/{kaggle_id}/json"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(api_url) as resp:
-                if resp.status != 200:
-                    await ctx.send(f"👤 {member.mention} → Kaggle ID: **{kaggle_id}** ({status})\n{profile_url}")
-                    return
-                data = await resp.json()
+        data = profile_cache.fresh(api_url)
+        resp_status = 200
+        if data is None:
+            try:
+                resp_status, data = await limiter.call(PRIORITY_BROWSE, profile_cache.fetch, api_url)
+            except (KaggleRetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Kaggle is throttling us or unreachable; an old profile beats none
+                print(f"⚠️ Profile fetch for {kaggle_id} failed: {e}")
+                data = profile_cache.stale(api_url)
+                resp_status = 200 if data is not None else None
+        if resp_status != 200:
+            await ctx.send(f"👤 {member.mention} → Kaggle ID: **{kaggle_id}** ({status})\n{profile_url}")
+            return
 
         # Extract details
         display_name = data.get("displayName", kaggle_id)
@@ -178,80 +310,57 @@ class Kaggle(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def unlink(self, ctx, member: discord.Member):
         """Unlink someone’s Kaggle ID (Admin only)."""
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("DELETE FROM kaggle_links WHERE discord_id = ?", (str(member.id),))
-        conn.commit()
-        changes = conn.total_changes
-        conn.close()
-
-        if changes > 0:
+        if await links.unlink(member.id):
             await ctx.send(f"🗑️ Kaggle ID unlinked for {member.mention}")
         else:
             await ctx.send(f"❌ {member.mention} has no Kaggle ID linked.")
 
+    @kaggle.group(name="reverify", invoke_without_command=True)
+    @commands.has_permissions(manage_guild=True)
+    async def reverify(self, ctx):
+        """Re-check every linked Kaggle account now (Admin only)."""
+        if not links:
+            await ctx.send("❌ No Kaggle IDs linked yet.")
+            return
+        task = reverify_job.start(f"manual by {ctx.author.display_name}")
+        await asyncio.sleep(0)  # let the run set up its progress
+        message = await ctx.send("🔄 Re-verifying Kaggle links...")
+        while not task.done():
+            if reverify_job.progress:
+                try:
+                    await message.edit(content=self._reverify_progress())
+                except Exception:
+                    pass
+            await asyncio.wait({task}, timeout=10)
+        if task.exception() is not None:
+            await ctx.send(f"⚠️ Re-verification stopped: `{task.exception()}`. Run it again to resume.")
+            return
+        await ctx.send(await self._reverify_report(ctx))
+
+    @reverify.command(name="status")
+    @commands.has_permissions(manage_guild=True)
+    async def reverify_status(self, ctx):
+        """Progress of the current re-verification, or the report of the last one."""
+        if reverify_job.running() and reverify_job.progress:
+            await ctx.send(self._reverify_progress())
+            return
+        await ctx.send(await self._reverify_report(ctx))
+
     @kaggle.command()
     async def list(self, ctx):
         """List all linked Kaggle IDs in the server (20 per page)."""
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("SELECT discord_id, kaggle_id, verified FROM kaggle_links")
-        rows = c.fetchall()
-        conn.close()
+        index = self._name_index(ctx.guild)
 
-        if not rows:
+        if not len(index):
             await ctx.send("❌ No Kaggle IDs linked yet.")
             return
 
-        # Sort alphabetically by Discord name (if available)
-        rows.sort(key=lambda r: (ctx.guild.get_member(int(r[0])).display_name 
-                                 if ctx.guild.get_member(int(r[0])) else str(r[0])))
-
-        # Pagination
-        per_page = 20
-        pages = math.ceil(len(rows) / per_page)
-
-        def make_page(page_index):
-            start = page_index * per_page
-            end = start + per_page
-            subset = rows[start:end]
-
-            lines = []
-            for discord_id, kaggle_id, verified in subset:
-                member = ctx.guild.get_member(int(discord_id))
-                name = member.display_name if member else f"Unknown({discord_id})"
-                check = "✅" if verified else "⚠️"
-                lines.append(f"{name:<20} | {kaggle_id:<20} {check}")
-
-            header = f"{'Discord Name':<20} | {'Kaggle ID':<20} Status"
-            content = "\n".join([header, "-"*50] + lines)
-            return f"```{content}```\nPage {page_index+1}/{pages}"
-
-        # Send first page
-        current_page = 0
-        message = await ctx.send(make_page(current_page))
-
-        # Add reactions for navigation if multiple pages
-        if pages > 1:
-            await message.add_reaction("◀")
-            await message.add_reaction("▶")
-
-            def check(reaction, user):
-                return user == ctx.author and str(reaction.emoji) in ["◀", "▶"] and reaction.message.id == message.id
-
-            while True:
-                try:
-                    reaction, user = await self.bot.wait_for("reaction_add", timeout=60.0, check=check)
-                    if str(reaction.emoji) == "▶" and current_page < pages - 1:
-                        current_page += 1
-                        await message.edit(content=make_page(current_page))
-                    elif str(reaction.emoji) == "◀" and current_page > 0:
-                        current_page -= 1
-                        await message.edit(content=make_page(current_page))
-
-                    await message.remove_reaction(reaction, user)
-                except Exception:
-                    break
+        view = LinkListView(index, ctx.author.id)
+        if len(index) <= LIST_PER_PAGE:
+            await ctx.send(view.render())
+            view.stop()
+            return
+        view.message = await ctx.send(view.render(), view=view)
 
 async def setup(bot):
     await bot.add_cog(Kaggle(bot))
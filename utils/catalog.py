@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from utils.ratelimit import PRIORITY_BROWSE, KaggleRetryableError, get_kaggle_limiter, is_retryable_status, status_of
+from utils.search import CompetitionIndex
+
+CATALOG_PATH = os.path.join("data", "kaggle_catalog.json")
+# How often the catalog is refreshed in the background, and how often that refresh walks every page (seconds)
+CATALOG_REFRESH_INTERVAL = float(os.getenv("KAGGLE_CATALOG_REFRESH", str(6 * 3600)))
+CATALOG_FULL_REFRESH = float(os.getenv("KAGGLE_CATALOG_FULL_REFRESH", str(7 * 24 * 3600)))
+# Safety cap on pages per listing (20 competitions per page)
+CATALOG_MAX_PAGES = int(os.getenv("KAGGLE_CATALOG_MAX_PAGES", "250"))
+CATALOG_PAGE_SIZE = 20
+
+
+def _normalize_category(value) -> str:
+    """'Getting Started' / 'gettingStarted' / 'getting_started' -> 'gettingstarted'."""
+    return "".join(ch for ch in str(value or "").lower() if ch.isalnum())
+
+
+def _deadline_ts(deadline):
+    if not deadline:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(deadline).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def competition_record(comp) -> dict:
+    """Turn a Kaggle API competition object into the plain dict we store."""
+    ref = str(getattr(comp, "ref", "") or "")
+    slug = ref.rstrip("/").split("/")[-1]
+    url = getattr(comp, "url", None) or (ref if ref.startswith("http") else f"https://www.kaggle.com/competitions/{slug}")
+    deadline = getattr(comp, "deadline", None)
+    if hasattr(deadline, "isoformat"):
+        deadline = deadline.isoformat()
+    tags = []
+    for tag in getattr(comp, "tags", None) or []:
+        name = getattr(tag, "name", None) or getattr(tag, "ref", None) or str(tag)
+        if name:
+            tags.append(str(name))
+
+    def _text(attr):
+        value = getattr(comp, attr, None)
+        return str(value) if value not in (None, "") else None
+
+    return {
+        "ref": slug,
+        "url": url,
+        "title": _text("title") or slug,
+        "description": _text("description"),
+        "category": _text("category"),
+        "reward": _text("reward"),
+        "deadline": str(deadline) if deadline else None,
+        "organization": _text("organization_name"),
+        "tags": tags,
+        "team_count": getattr(comp, "team_count", None),
+    }
+
+
+def _page_items(result):
+    """Return (competitions, next_page_token) from either a plain list or a paged API response."""
+    if result is None:
+        return [], None
+    if isinstance(result, list):
+        return result, None
+    return list(getattr(result, "competitions", None) or []), getattr(result, "next_page_token", None) or None
+
+
+class KaggleCatalog:
+    """
+    Every Kaggle competition we know about, kept on disk so ;gitgud never waits on Kaggle.
+
+    Refreshes are incremental: the (small) list of running competitions is always re-read, then
+    the full listing is walked newest first and stops at the first page with nothing new or
+    changed. Every CATALOG_FULL_REFRESH seconds the walk goes through every page instead, which
+    also drops competitions Kaggle no longer lists.
+    `list_fn` is the Kaggle API's competitions_list; it is called off the event loop through
+    the shared rate limiter.
+    """
+
+    def __init__(self, list_fn, path: str = CATALOG_PATH, limiter=None):
+        self.list_fn = list_fn
+        self.path = path
+        self.limiter = limiter or get_kaggle_limiter()
+        self.competitions = {}  # {ref: record}
+        self.updated_at = 0.0
+        self.full_at = 0.0
+        self._refresh_task = None
+        self._index = None  # CompetitionIndex, rebuilt lazily after the catalog changes
+        self._index_version = None
+        self.stats = {"refreshes": 0, "pages": 0, "changed": 0}
+        self._load()
+
+    def __len__(self):
+        return len(self.competitions)
+
+    # ---- persistence ----
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read Kaggle catalog {self.path}: {e}")
+            return
+        self.competitions = {c["ref"]: c for c in data.get("competitions", [])}
+        self.updated_at = data.get("updated_at", 0.0)
+        self.full_at = data.get("full_at", 0.0)
+        print(f"📚 Loaded {len(self.competitions)} Kaggle competitions from {self.path}")
+
+    def _save(self):
+        data = {
+            "updated_at": self.updated_at,
+            "full_at": self.full_at,
+            "competitions": list(self.competitions.values()),
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)  # never leave a half-written catalog behind
+
+    # ---- refresh ----
+    async def refresh(self, full: bool = False):
+        """Refresh the catalog; concurrent callers share one refresh."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh(full))
+        await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self, full):
+        started = time.time()
+        full = full or not self.competitions or started - self.full_at > CATALOG_FULL_REFRESH
+        seen = {}
+        # Running competitions change the most (teams, deadlines), and there are only a few pages
+        await self._sweep({}, seen, stop_when_unchanged=False)
+        # Then everything, newest first
+        complete = await self._sweep({"category": "all", "sort_by": "recentlyCreated"}, seen,
+                                     stop_when_unchanged=not full)
+
+        changed = sum(1 for ref, rec in seen.items() if self.competitions.get(ref) != rec)
+        if full and complete:
+            removed = len(self.competitions.keys() - seen.keys())
+            self.competitions = seen
+            self.full_at = started
+        else:
+            removed = 0
+            self.competitions.update(seen)
+        self.updated_at = started
+        # Rebuild the search index off the loop so the first search after a refresh stays fast
+        self._index = await asyncio.to_thread(CompetitionIndex, list(self.competitions.values()))
+        self._index_version = started
+        self.stats["refreshes"] += 1
+        self.stats["changed"] += changed
+
+        try:
+            await asyncio.to_thread(self._save)
+        except OSError as e:
+            print(f"⚠️ Could not save Kaggle catalog: {e}")
+        print(f"📚 Kaggle catalog {'full' if full else 'incremental'} refresh: {len(seen)} read, "
+              f"{changed} new/changed, {removed} removed, {len(self.competitions)} total")
+
+    async def _sweep(self, params, seen, stop_when_unchanged: bool) -> bool:
+        """Read one listing page by page into `seen`. Returns True if it reached the last page."""
+        page, token = 1, None
+        for _ in range(CATALOG_MAX_PAGES):
+            try:
+                items, token = await self.limiter.call(PRIORITY_BROWSE, self._list_page, params, page, token)
+            except Exception as e:
+                print(f"⚠️ Kaggle catalog refresh stopped at page {page} of {params or 'active'}: {e}")
+                return False
+            self.stats["pages"] += 1
+            records = [competition_record(c) for c in items]
+            unchanged = all(self.competitions.get(r["ref"]) == r for r in records)
+            for r in records:
+                seen[r["ref"]] = r
+            if not records or (token is None and len(records) < CATALOG_PAGE_SIZE):
+                return True
+            if stop_when_unchanged and unchanged:
+                return False
+            page += 1
+        return False
+
+    async def _list_page(self, params, page, token):
+        kwargs = dict(params)
+        if token:
+            kwargs["page_token"] = token
+        else:
+            kwargs["page"] = page
+        try:
+            result = await asyncio.to_thread(self.list_fn, **kwargs)
+        except Exception as e:
+            status = status_of(e)
+            if is_retryable_status(status):
+                raise KaggleRetryableError(f"competitions_list returned HTTP {status}", status=status) from e
+            raise
+        return _page_items(result)
+
+    # ---- queries ----
+    def index(self) -> CompetitionIndex:
+        """Keyword search index over the current catalog."""
+        if self._index is None or self._index_version != self.updated_at:
+            self._index = CompetitionIndex(self.competitions.values())
+            self._index_version = self.updated_at
+        return self._index
+
+    def find(self, category=None, status="active", refs=None):
+        """
+        Competitions matching the filters.
+        - category: Kaggle category (featured, playground, gettingStarted, ...), any spelling
+        - status: 'active' (deadline in the future), 'closed' or 'all'
+        - refs: only these competitions (e.g. the ones a search matched)
+        """
+        now = time.time()
+        category = _normalize_category(category) if category else None
+        candidates = self.competitions.values() if refs is None else (
+            self.competitions[r] for r in refs if r in self.competitions
+        )
+        out = []
+        for comp in candidates:
+            if category and _normalize_category(comp.get("category")) != category:
+                continue
+            if status != "all":
+                deadline = _deadline_ts(comp.get("deadline"))
+                active = deadline is None or deadline > now
+                if active != (status == "active"):
+                    continue
+            out.append(comp)
+        return out
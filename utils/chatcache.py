@@ -0,0 +1,104 @@
+import os
+import re
+import time
+from collections import OrderedDict
+
+# Set CHAT_CACHE=0 to always ask Gemini
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE", "1") != "0"
+# How long a cached answer is served (seconds) and how many are kept
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", str(6 * 3600)))
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "256"))
+# Longer prompts are rarely repeated word for word; don't bother caching them
+CHAT_CACHE_MAX_PROMPT = int(os.getenv("CHAT_CACHE_MAX_PROMPT", "200"))
+
+_WORD = re.compile(r"[a-z0-9']+")
+# Words that point back into the conversation; a prompt using them means something different each time
+_CONTEXT_WORDS = frozenset(
+    "it its this that these those he she him her they them their above previous earlier again "
+    "also else more continue same said".split()
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """'How do I join??' / 'how do i JOIN' -> 'how do i join'."""
+    return " ".join(_WORD.findall((prompt or "").lower()))
+
+
+def is_standalone(normalized: str) -> bool:
+    """True if a prompt reads the same whatever was said before it, so its answer can be reused."""
+    words = normalized.split()
+    return bool(words) and len(normalized) <= CHAT_CACHE_MAX_PROMPT and not _CONTEXT_WORDS.intersection(words)
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of chat answers for repeated standalone questions.
+
+    Keyed on (scope, normalized prompt) where scope is the guild, since answers about joining,
+    baselines etc. are server-specific. The key deliberately leaves out channel history: only
+    standalone prompts (see is_standalone) are cached, so the same answer fits any channel.
+    Replies that mention the asker by name are not stored, so nobody gets an answer addressed
+    to someone else. Entries remember the channel they were created in so forget_here can drop
+    them along with that channel's memory.
+    """
+
+    def __init__(self, ttl: float = CHAT_CACHE_TTL, max_entries: int = CHAT_CACHE_SIZE,
+                 enabled: bool = CHAT_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = OrderedDict()  # {(scope, prompt): (stored_at, channel_id, reply)}
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "personal": 0, "expired": 0, "evicted": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def get(self, scope, prompt: str):
+        """Cached reply for a prompt, or None. Prompts that depend on context never hit."""
+        if not self.enabled:
+            return None
+        normalized = normalize_prompt(prompt)
+        if not is_standalone(normalized):
+            return None
+        key = (scope, normalized)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            self.stats["expired"] += 1
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[2]
+
+    def put(self, scope, channel_id, prompt: str, reply: str, author_names=()):
+        """Store a reply. `author_names` are the asker's names; a reply using any of them isn't cached."""
+        if not self.enabled or not reply:
+            return
+        normalized = normalize_prompt(prompt)
+        if not is_standalone(normalized):
+            return
+        lowered = reply.casefold()
+        if any(name and name.casefold() in lowered for name in author_names):
+            self.stats["personal"] += 1
+            return
+        key = (scope, normalized)
+        self._entries[key] = (time.monotonic(), channel_id, reply)
+        self._entries.move_to_end(key)
+        self.stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def forget_channel(self, channel_id):
+        for key in [k for k, e in self._entries.items() if e[1] == channel_id]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+CHAT_MEMORY_PATH = os.path.join("data", "chat_memory.json")
+# Channels remembered at once; the least recently active ones are forgotten first
+CHAT_MAX_CHANNELS = int(os.getenv("CHAT_MAX_CHANNELS", "200"))
+# Tokens of raw turns kept per channel before older ones are folded into the summary
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "6000"))
+# Upper bound on the rolling summary itself
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "600"))
+# Compaction keeps this fraction of the budget as raw turns, so it doesn't run on every message
+CHAT_COMPACT_TO = 0.5
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); good enough for budgeting without a network call."""
+    return len(text or "") // 4 + 1
+
+
+def _turn_tokens(turn) -> int:
+    return sum(estimate_tokens(p) for p in turn["parts"])
+
+
+class ChatMemory:
+    """
+    Bounded per-channel conversation memory for the Chat cog.
+
+    Each channel keeps recent turns ({"role", "parts"}) up to CHAT_TOKEN_BUDGET tokens plus a
+    rolling summary of everything older. When a channel goes over budget, its oldest turns are
+    handed to `summarize(summary, turns) -> str` and replaced by the new summary; if that fails
+    they are just dropped. At most CHAT_MAX_CHANNELS channels are kept, least recently used
+    evicted first. State is saved to `path` (call save() periodically) and reloaded on start.
+    """
+
+    def __init__(self, summarize=None, path: str = CHAT_MEMORY_PATH, max_channels: int = CHAT_MAX_CHANNELS,
+                 token_budget: int = CHAT_TOKEN_BUDGET, summary_tokens: int = CHAT_SUMMARY_TOKENS):
+        self.summarize = summarize
+        self.path = path
+        self.max_channels = max_channels
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self._channels = OrderedDict()  # {channel_id: {"summary", "turns", "tokens", "updated_at"}}
+        self._compacting = set()
+        self.dirty = False
+        self.stats = {"compactions": 0, "summarize_failures": 0, "evicted": 0}
+        self._load()
+
+    def __len__(self):
+        return len(self._channels)
+
+    def __contains__(self, channel_id):
+        return channel_id in self._channels
+
+    # ---- persistence ----
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read chat memory {self.path}: {e}")
+            return
+        channels = sorted(data.get("channels", []), key=lambda c: c.get("updated_at", 0))
+        for c in channels[-self.max_channels:]:
+            turns = c.get("turns", [])
+            self._channels[int(c["channel_id"])] = {
+                "summary": c.get("summary", ""),
+                "turns": turns,
+                "tokens": sum(_turn_tokens(t) for t in turns),
+                "updated_at": c.get("updated_at", 0),
+            }
+        print(f"🧠 Loaded chat memory for {len(self._channels)} channel(s) from {self.path}")
+
+    def _write(self, data):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    async def save(self):
+        """Write the memory to disk if it changed since the last save."""
+        if not self.dirty:
+            return
+        # Snapshot on the loop (lists are copied, turn dicts are never mutated), serialise off it
+        data = {"channels": [
+            {"channel_id": cid, "summary": c["summary"], "turns": list(c["turns"]), "updated_at": c["updated_at"]}
+            for cid, c in self._channels.items()
+        ]}
+        self.dirty = False
+        try:
+            await asyncio.to_thread(self._write, data)
+        except OSError as e:
+            self.dirty = True
+            print(f"⚠️ Could not save chat memory: {e}")
+
+    # ---- reads/writes ----
+    def _channel(self, channel_id):
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self._channels[channel_id] = {"summary": "", "turns": [], "tokens": 0, "updated_at": 0}
+            while len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+                self.stats["evicted"] += 1
+        self._channels.move_to_end(channel_id)
+        return channel
+
+    def add(self, channel_id, role: str, text: str):
+        """Append one turn and mark the channel as most recently used."""
+        channel = self._channel(channel_id)
+        turn = {"role": role, "parts": [text]}
+        channel["turns"].append(turn)
+        channel["tokens"] += _turn_tokens(turn)
+        channel["updated_at"] = time.time()
+        self.dirty = True
+
+    def history(self, channel_id):
+        """
+        Contents to send to Gemini for a channel: the summary (as an opening exchange) followed by
+        the newest turns that fit in the token budget, starting at a user turn.
+        """
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            return []
+        turns, used = [], 0
+        for turn in reversed(channel["turns"]):
+            used += _turn_tokens(turn)
+            if used > self.token_budget and turns:
+                break
+            turns.append(turn)
+        turns.reverse()
+        while len(turns) > 1 and turns[0]["role"] != "user":
+            turns.pop(0)
+        if channel["summary"]:
+            return [
+                {"role": "user", "parts": [f"Summary of the conversation so far:\n{channel['summary']}"]},
+                {"role": "model", "parts": ["Got it, I'll keep that in mind."]},
+            ] + turns
+        return turns
+
+    def forget(self, channel_id):
+        if self._channels.pop(channel_id, None) is not None:
+            self.dirty = True
+
+    def clear(self):
+        self._channels.clear()
+        self.dirty = True
+
+    # ---- compaction ----
+    async def compact(self, channel_id):
+        """Fold a channel's oldest turns into its summary once it is over the token budget."""
+        channel = self._channels.get(channel_id)
+        if channel is None or channel["tokens"] <= self.token_budget or channel_id in self._compacting:
+            return
+        self._compacting.add(channel_id)
+        try:
+            # Oldest turns until what's left fits in CHAT_COMPACT_TO of the budget; end on a model turn
+            turns, tokens, count = channel["turns"], channel["tokens"], 0
+            target = self.token_budget * CHAT_COMPACT_TO
+            while count < len(turns) - 1 and (tokens > target or turns[count]["role"] != "user"):
+                tokens -= _turn_tokens(turns[count])
+                count += 1
+            old = turns[:count]
+            if not old:
+                return
+
+            summary = channel["summary"]
+            if self.summarize is not None:
+                try:
+                    summary = (await self.summarize(summary, old)).strip()
+                    self.stats["compactions"] += 1
+                except Exception as e:
+                    self.stats["summarize_failures"] += 1
+                    print(f"⚠️ Chat summary failed for channel {channel_id}, dropping {count} old turn(s): {e}")
+            max_chars = self.summary_tokens * 4
+            if len(summary) > max_chars:
+                summary = summary[-max_chars:]
+
+            # Forgotten or evicted while we were summarising
+            if self._channels.get(channel_id) is not channel:
+                return
+            # Turns are only ever appended, so the first `count` are still the ones we summarised
+            del channel["turns"][:count]
+            channel["tokens"] = sum(_turn_tokens(t) for t in channel["turns"])
+            channel["summary"] = summary
+            self.dirty = True
+        finally:
+            self._compacting.discard(channel_id)
@@ -0,0 +1,81 @@
+import asyncio
+import os
+from collections import deque
+
+# Model calls in flight across all channels
+CHAT_MAX_CONCURRENT = int(os.getenv("CHAT_MAX_CONCURRENT", "4"))
+# Messages waiting per channel, and in total, before new ones get a "busy" reply
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "5"))
+CHAT_MAX_PENDING = int(os.getenv("CHAT_MAX_PENDING", "40"))
+# Messages that piled up in a channel while it was busy are answered together, up to this many
+CHAT_COALESCE_MAX = int(os.getenv("CHAT_COALESCE_MAX", "5"))
+
+
+class ChatScheduler:
+    """
+    Runs chat generations one channel at a time, in arrival order.
+
+    Each channel has a FIFO queue drained by its own worker task; the worker takes everything
+    that queued up while the previous reply was being generated (up to CHAT_COALESCE_MAX) and
+    hands it to `handler(channel_id, items)` as one batch. A semaphore caps handler calls across
+    all channels at CHAT_MAX_CONCURRENT. submit() refuses new items once a channel has
+    CHAT_MAX_QUEUE waiting or CHAT_MAX_PENDING are waiting overall.
+    """
+
+    def __init__(self, handler, max_concurrent: int = CHAT_MAX_CONCURRENT, max_queue: int = CHAT_MAX_QUEUE,
+                 max_pending: int = CHAT_MAX_PENDING, coalesce_max: int = CHAT_COALESCE_MAX):
+        self.handler = handler
+        self.max_queue = max_queue
+        self.max_pending = max_pending
+        self.coalesce_max = coalesce_max
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._queues = {}  # {channel_id: deque of items}
+        self._workers = {}  # {channel_id: task}
+        self.pending = 0  # items queued but not yet handed to the handler
+        self.stats = {"batches": 0, "messages": 0, "coalesced": 0, "shed": 0, "max_pending": 0}
+
+    def idle(self, channel_id) -> bool:
+        """True if nothing is queued or being generated for the channel."""
+        return channel_id not in self._workers
+
+    def submit(self, channel_id, item) -> bool:
+        """Queue an item for its channel. Returns False (and queues nothing) if we're too busy."""
+        queue = self._queues.setdefault(channel_id, deque())
+        if len(queue) >= self.max_queue or self.pending >= self.max_pending:
+            self.stats["shed"] += 1
+            if not queue and channel_id not in self._workers:
+                del self._queues[channel_id]
+            return False
+        queue.append(item)
+        self.pending += 1
+        self.stats["max_pending"] = max(self.stats["max_pending"], self.pending)
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.create_task(self._drain(channel_id))
+        return True
+
+    async def _drain(self, channel_id):
+        queue = self._queues[channel_id]
+        try:
+            while queue:
+                async with self._slots:
+                    batch = [queue.popleft() for _ in range(min(len(queue), self.coalesce_max))]
+                    self.pending -= len(batch)
+                    self.stats["batches"] += 1
+                    self.stats["messages"] += len(batch)
+                    self.stats["coalesced"] += len(batch) - 1
+                    try:
+                        await self.handler(channel_id, batch)
+                    except Exception as e:
+                        print(f"⚠️ Chat reply failed in channel {channel_id}: {e}")
+        finally:
+            # No await between the last empty check and here, so nothing can slip in unseen
+            self._workers.pop(channel_id, None)
+            if not queue:
+                self._queues.pop(channel_id, None)
+
+    def close(self):
+        for task in self._workers.values():
+            task.cancel()
+        self._workers.clear()
+        self._queues.clear()
+        self.pending = 0
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+# Holds kaggle_links; read through utils.links.KaggleLinkDirectory
+KAGGLE_DB = os.path.join("data", "kaggle.db")
+
+
+class Database:
+    """
+    One long-lived SQLite connection per database file, owned by a dedicated worker thread.
+
+    Every query runs on that thread, so the event loop never waits on disk I/O, and because the
+    connection is reused, sqlite3's per-connection statement cache keeps hot queries prepared.
+    The database is put in WAL mode with synchronous=NORMAL, so commits don't fsync every time
+    and readers don't block the writer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None  # created on the worker thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sqlite-{os.path.basename(path)}")
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._conn = conn
+        return self._conn
+
+    def _call(self, fn, *args):
+        return fn(self._connection(), *args)
+
+    async def run(self, fn, *args):
+        """Run fn(conn, *args) on the database thread and return its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, *args)
+
+    def run_blocking(self, fn, *args):
+        """Like run, but waits synchronously. Only for startup code that runs before the bot is live."""
+        return self._executor.submit(self._call, fn, *args).result()
+
+    async def transaction(self, fn, *args):
+        """Run fn(conn, *args) inside one transaction: committed if it returns, rolled back if it raises."""
+        def _tx(conn, *a):
+            with conn:
+                return fn(conn, *a)
+        return await self.run(_tx, *args)
+
+    async def execute(self, sql: str, params=()):
+        """Execute one write statement and commit. Returns the number of affected rows."""
+        def _execute(conn):
+            with conn:
+                return conn.execute(sql, params).rowcount
+        return await self.run(_execute)
+
+    async def executemany(self, sql: str, seq_of_params):
+        def _executemany(conn):
+            with conn:
+                return conn.executemany(sql, seq_of_params).rowcount
+        return await self.run(_executemany)
+
+    async def fetchone(self, sql: str, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    def close(self):
+        if self._conn is not None:
+            self._executor.submit(self._conn.close).result()
+            self._conn = None
+
+
+_databases = {}
+
+
+def get_database(path: str) -> Database:
+    """Return the shared Database for path, creating it on first use."""
+    key = os.path.abspath(path)
+    db = _databases.get(key)
+    if db is None:
+        db = _databases[key] = Database(path)
+    return db
@@ -0,0 +1,163 @@
+import os
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+from utils.ratelimit import KaggleRetryableError, is_retryable_status, parse_retry_after
+
+# Whole-request and connect timeouts for outgoing HTTP (seconds)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+# Max open connections in the shared pool, and how long idle ones are kept alive (seconds)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", "60"))
+# Kaggle profile JSON: how long it is served without asking Kaggle, and how many profiles we keep
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "600"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "512"))
+# Streaming page scans (;kaggle verify): give up after this many bytes or seconds
+SCAN_MAX_BYTES = int(os.getenv("KAGGLE_VERIFY_MAX_BYTES", str(2 * 1024 * 1024)))
+SCAN_TIMEOUT = float(os.getenv("KAGGLE_VERIFY_TIMEOUT", "15"))
+SCAN_CHUNK_SIZE = 16 * 1024
+
+_session = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Return the bot-wide aiohttp session, creating it on first use (inside the running loop).
+    Connections are pooled and kept alive, so repeated Kaggle requests skip DNS and TLS setup.
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, ttl_dns_cache=300, keepalive_timeout=HTTP_KEEPALIVE)
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+    return _session
+
+
+async def close_http_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def stream_contains(url: str, needle: str, max_bytes: int = SCAN_MAX_BYTES, timeout: float = SCAN_TIMEOUT):
+    """
+    GET url and scan the body for `needle` chunk by chunk, stopping as soon as it shows up.
+    The last len(needle)-1 bytes of each chunk are carried over, so a match split across a chunk
+    boundary is still found. Reading stops after `max_bytes`; the whole request is bounded by `timeout`.
+    Returns (status, found). Raises KaggleRetryableError on 429/5xx and asyncio.TimeoutError on timeout.
+    """
+    target = needle.encode()
+    keep = max(len(target) - 1, 0)
+    async with get_http_session().get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        if is_retryable_status(resp.status):
+            raise KaggleRetryableError(
+                f"HTTP {resp.status} from {url}", status=resp.status,
+                retry_after=parse_retry_after(resp.headers.get("Retry-After")),
+            )
+        if resp.status != 200:
+            return resp.status, False
+
+        read = 0
+        tail = b""
+        found = False
+        async for chunk in resp.content.iter_chunked(SCAN_CHUNK_SIZE):
+            window = tail + chunk
+            if target in window:
+                found = True
+                break
+            read += len(chunk)
+            if read >= max_bytes:
+                break
+            tail = window[-keep:] if keep else b""
+        if not resp.content.at_eof():
+            resp.close()  # drop the rest of the body instead of draining it into the pool
+        return resp.status, found
+
+
+async def probe(url: str):
+    """
+    GET url without reading the body. Returns (status, final URL after redirects).
+    Raises KaggleRetryableError on 429/5xx.
+    """
+    async with get_http_session().get(url) as resp:
+        if is_retryable_status(resp.status):
+            raise KaggleRetryableError(
+                f"HTTP {resp.status} from {url}", status=resp.status,
+                retry_after=parse_retry_after(resp.headers.get("Retry-After")),
+            )
+        resp.close()
+        return resp.status, str(resp.url)
+
+
+class JsonCache:
+    """
+    TTL + LRU cache of JSON responses keyed by URL.
+
+    Fresh entries are served without any request. Once an entry is older than `ttl` it is
+    revalidated with If-None-Match / If-Modified-Since, so an unchanged resource costs a
+    304 instead of a full download. At most `max_entries` URLs are kept.
+    """
+
+    def __init__(self, ttl: float = PROFILE_CACHE_TTL, max_entries: int = PROFILE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # {url: (fetched_at, etag, last_modified, data)}
+        self.stats = {"hits": 0, "revalidated": 0, "fetched": 0}
+
+    def fresh(self, url):
+        """Return cached data for url if it is still within the TTL, else None."""
+        entry = self._entries.get(url)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        self._entries.move_to_end(url)
+        self.stats["hits"] += 1
+        return entry[3]
+
+    def stale(self, url):
+        """Return cached data for url regardless of age, or None."""
+        entry = self._entries.get(url)
+        return entry[3] if entry else None
+
+    def _put(self, url, etag, last_modified, data):
+        self._entries[url] = (time.monotonic(), etag, last_modified, data)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def fetch(self, url):
+        """
+        GET url (conditionally if we have a validator) and return (status, data).
+        data is None unless the status is 200 (304s come back as 200 with the cached data).
+        Raises KaggleRetryableError on 429/5xx.
+        """
+        headers = {}
+        entry = self._entries.get(url)
+        if entry is not None:
+            _, etag, last_modified, _ = entry
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        async with get_http_session().get(url, headers=headers) as resp:
+            if resp.status == 304 and entry is not None:
+                self._put(url, entry[1], entry[2], entry[3])
+                self.stats["revalidated"] += 1
+                return 200, entry[3]
+            if is_retryable_status(resp.status):
+                raise KaggleRetryableError(
+                    f"HTTP {resp.status} from {url}", status=resp.status,
+                    retry_after=parse_retry_after(resp.headers.get("Retry-After")),
+                )
+            if resp.status != 200:
+                return resp.status, None
+            data = await resp.json()
+            self._put(url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), data)
+            self.stats["fetched"] += 1
+            return 200, data
@@ -0,0 +1,324 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import time
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.ratelimit import (
+    PRIORITY_LEADERBOARD, KaggleRequest, KaggleRetryableError, get_kaggle_limiter, is_retryable_output,
+)
+
+# How long a downloaded leaderboard is trusted before we hit Kaggle again (seconds)
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", "300"))
+# How many competitions we keep parsed leaderboards for at once
+LEADERBOARD_CACHE_SIZE = int(os.getenv("LEADERBOARD_CACHE_SIZE", "32"))
+# Give up on a Kaggle CLI download after this many seconds
+LEADERBOARD_DOWNLOAD_TIMEOUT = float(os.getenv("LEADERBOARD_DOWNLOAD_TIMEOUT", "120"))
+
+
+class LeaderboardUnavailable(Exception):
+    """Raised when a leaderboard we need could not be downloaded or parsed."""
+
+
+class Leaderboard:
+    """
+    A parsed Kaggle leaderboard snapshot.
+    Scores and ranks are kept as NumPy arrays; every team member username and team name
+    is indexed once to its row, so lookups are O(1).
+    """
+
+    def __init__(self, index, scores=None, ranks=None):
+        self.index = index  # {username or team name (lowercased): row}
+        self.scores = np.asarray(scores if scores is not None else [], dtype=float)
+        self.ranks = np.asarray(ranks if ranks is not None else [], dtype=np.int64)
+        self.count = len(self.scores)
+        self.min_score = float(self.scores.min()) if self.count else None
+        self.max_score = float(self.scores.max()) if self.count else None
+        self.fingerprint = None  # SHA-256 of the CSV this was parsed from, if known
+
+    def entry(self, kaggle_id: str):
+        """Return (score, rank) for a Kaggle username or team name, or None if not on the board."""
+        row = self.index.get((kaggle_id or "").strip().lower())
+        if row is None:
+            return None
+        return float(self.scores[row]), int(self.ranks[row])
+
+    def lookup(self, kaggle_id: str):
+        """Return (user_score, min_score, max_score) for a Kaggle username or team name."""
+        entry = self.entry(kaggle_id)
+        user_score = entry[0] if entry else 0.0
+
+        # Fallbacks if CSV was weird/empty
+        min_score = user_score if self.min_score is None else self.min_score
+        max_score = user_score if self.max_score is None else self.max_score
+        return user_score, min_score, max_score
+
+
+# Lowercased header names we understand (Kaggle CSV can vary)
+MEMBER_COLUMNS = ("teammemberusernames", "team member usernames", "username")
+
+
+def _read_header(source):
+    """Return the CSV's column names without consuming a file object."""
+    start = source.tell() if hasattr(source, "seek") else None
+    columns = pd.read_csv(source, nrows=0, encoding="utf-8-sig").columns
+    if start is not None:
+        source.seek(start)
+    return columns
+
+
+def parse_leaderboard_csv(source) -> Leaderboard:
+    """
+    Parse a Kaggle leaderboard CSV (path or seekable file object) into an indexed Leaderboard.
+    Columns are detected once per file; scores and ranks are loaded and cleaned as whole arrays.
+    """
+    colmap = {c.strip().lower(): c for c in _read_header(source)}
+    score_col = colmap.get("score")
+    if score_col is None:
+        return Leaderboard({})
+    rank_col = colmap.get("rank")
+    team_col = colmap.get("teamname")
+    members_col = next((colmap[k] for k in MEMBER_COLUMNS if k in colmap), None)
+    name_cols = [c for c in (team_col, members_col) if c is not None]
+
+    df = pd.read_csv(
+        source,
+        encoding="utf-8-sig",
+        usecols=[c for c in (score_col, rank_col, *name_cols) if c is not None],
+        # Names stay strings even when they look numeric; the score column is inferred as float
+        dtype={c: str for c in name_cols},
+        keep_default_na=False,
+        na_values={score_col: [""]},
+    )
+
+    scores = df[score_col]
+    if scores.dtype == object or pd.api.types.is_string_dtype(scores):
+        scores = pd.to_numeric(scores, errors="coerce")
+    scores = scores.to_numpy(dtype=float)
+
+    position = np.arange(1, len(df) + 1)
+    if rank_col is not None:
+        ranks = pd.to_numeric(df[rank_col], errors="coerce").to_numpy(dtype=float)
+        ranks = np.where(np.isnan(ranks), position, ranks).astype(np.int64)
+    else:
+        ranks = position
+
+    # Drop rows whose score doesn't parse
+    valid = ~np.isnan(scores)
+    if not valid.all():
+        df = df[valid]
+        scores, ranks = scores[valid], ranks[valid]
+
+    # Index names -> row. Built in reverse so the first (best ranked) row wins;
+    # member usernames are applied last so they take precedence over team names.
+    index = {}
+    if team_col is not None:
+        teams = [t.strip().lower() for t in df[team_col].tolist()]
+        index.update(zip(reversed(teams), range(len(teams) - 1, -1, -1)))
+    if members_col is not None:
+        members = df[members_col].tolist()
+        counts = np.fromiter((m.count(",") + 1 for m in members), dtype=np.int64, count=len(members))
+        names = [n.strip() for n in ",".join(members).lower().split(",")]
+        rows = np.repeat(np.arange(len(members)), counts).tolist()
+        index.update(zip(reversed(names), reversed(rows)))
+    index.pop("", None)
+
+    return Leaderboard(index, scores, ranks)
+
+
+class LeaderboardCache:
+    """
+    Keeps one parsed leaderboard per comp_id for `ttl` seconds, so every lookup in that
+    window (join, leaderboard, freeze, forcejoin) is answered from the same snapshot.
+    Stale snapshots are kept (but not served by get) so a refresh can reuse them when the
+    download turns out unchanged. Least recently used competitions are evicted once
+    `max_entries` is exceeded.
+    """
+
+    def __init__(self, ttl: float = LEADERBOARD_TTL, max_entries: int = LEADERBOARD_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # {comp_id: (fetched_at, Leaderboard)}
+
+    def get(self, comp_id):
+        """Return the snapshot for comp_id if it is still fresh, else None."""
+        entry = self._entries.get(comp_id)
+        if entry is None:
+            return None
+        fetched_at, board = entry
+        if time.monotonic() - fetched_at > self.ttl:
+            return None
+        self._entries.move_to_end(comp_id)
+        return board
+
+    def get_stale(self, comp_id):
+        """Return the last snapshot for comp_id regardless of age, or None."""
+        entry = self._entries.get(comp_id)
+        return entry[1] if entry else None
+
+    def put(self, comp_id, board: Leaderboard):
+        self._entries[comp_id] = (time.monotonic(), board)
+        self._entries.move_to_end(comp_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, comp_id=None):
+        """Drop one competition's snapshot, or everything if comp_id is None."""
+        if comp_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(comp_id, None)
+
+
+class LeaderboardDownloader:
+    """
+    Downloads leaderboards with the Kaggle CLI without blocking the event loop.
+    Concurrent requests for the same comp_id share one in-flight download (single-flight),
+    and successful results are stored in the given LeaderboardCache.
+    Each download is fingerprinted (SHA-256 of the CSV); if it matches the previous snapshot
+    the already-parsed Leaderboard is reused instead of parsing again.
+    If a SnapshotStore is given, every successful download is recorded in it with its timestamp.
+    CLI calls go through the shared Kaggle rate limiter; a download waiting there is promoted
+    when a more urgent caller (e.g. a freeze) asks for the same comp_id.
+    """
+
+    def __init__(self, cache: LeaderboardCache, timeout: float = LEADERBOARD_DOWNLOAD_TIMEOUT, store=None,
+                 limiter=None):
+        self.cache = cache
+        self.timeout = timeout
+        self.store = store
+        self.limiter = limiter or get_kaggle_limiter()
+        self._inflight = {}  # {comp_id: (asyncio.Task, KaggleRequest)}
+        # cache_hits: served from a fresh snapshot, unchanged: downloaded but identical, parsed: new data
+        self.stats = {"cache_hits": 0, "downloads": 0, "unchanged": 0, "parsed": 0, "failed": 0}
+
+    async def get(self, comp_id, priority: int = PRIORITY_LEADERBOARD):
+        """Return a fresh Leaderboard for comp_id, or None if it could not be downloaded."""
+        board = self.cache.get(comp_id)
+        if board is not None:
+            self.stats["cache_hits"] += 1
+            return board
+
+        inflight = self._inflight.get(comp_id)
+        if inflight is None:
+            request = KaggleRequest(priority)
+            task = asyncio.create_task(self._download(comp_id, request))
+            self._inflight[comp_id] = (task, request)
+            task.add_done_callback(lambda _t, cid=comp_id: self._inflight.pop(cid, None))
+        else:
+            task, request = inflight
+            self.limiter.promote(request, priority)
+        # shield: one waiter being cancelled must not cancel the download for everyone else
+        return await asyncio.shield(task)
+
+    async def _download(self, comp_id, request):
+        self.stats["downloads"] += 1
+        previous = self.cache.get_stale(comp_id)
+        # Each download gets its own scratch dir, so concurrent fetches never touch each other's files
+        with tempfile.TemporaryDirectory(prefix=f"lb_{comp_id}_") as download_dir:
+            try:
+                ok = await self.limiter.call(request, self._run_cli, comp_id, download_dir)
+            except KaggleRetryableError as e:
+                print(f"❌ Kaggle kept refusing the leaderboard for {comp_id}: {e}")
+                ok = False
+            if not ok:
+                self.stats["failed"] += 1
+                return None
+
+            # Parse straight out of the archive, off the loop
+            try:
+                board = await asyncio.to_thread(_parse_download, comp_id, download_dir, previous)
+            except Exception as e:
+                print(f"❌ Failed to parse leaderboard CSV: {e}")
+                board = None
+
+        if board is None:
+            self.stats["failed"] += 1
+            return None
+        if board is previous:
+            self.stats["unchanged"] += 1
+            print(f"♻️ Leaderboard for {comp_id} unchanged, reusing parsed snapshot")
+        else:
+            self.stats["parsed"] += 1
+        self.cache.put(comp_id, board)
+
+        if self.store is not None:
+            try:
+                await self.store.record(comp_id, board, time.time())
+            except Exception as e:
+                print(f"⚠️ Failed to store leaderboard snapshot for {comp_id}: {e}")
+        return board
+
+    async def _run_cli(self, comp_id, download_dir):
+        """
+        One Kaggle CLI download attempt. Returns False on failures retrying won't fix,
+        raises KaggleRetryableError when Kaggle throttled us or had a server error.
+        """
+        print(f"📥 Downloading leaderboard for {comp_id}...")
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "kaggle", "competitions", "leaderboard", comp_id, "--download", "-p", download_dir,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError as e:
+            print(f"❌ Could not start Kaggle CLI: {e}")
+            return False
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            print(f"❌ Kaggle CLI timed out after {self.timeout:.0f}s for {comp_id}")
+            return False
+        if proc.returncode != 0:
+            output = (stderr or stdout).decode(errors="replace")
+            if is_retryable_output(output):
+                status = 429 if "429" in output or "too many" in output.lower() else None
+                raise KaggleRetryableError(output.strip()[:200], status=status)
+            print(f"❌ Kaggle CLI failed: {output}")
+            return False
+        return True
+
+
+def _read_download(comp_id, download_dir):
+    """Return the raw CSV bytes the CLI wrote to download_dir, read from the zip in memory."""
+    files = os.listdir(download_dir)
+    zip_files = [f for f in files if f.endswith(".zip")]
+    if zip_files:
+        with zipfile.ZipFile(os.path.join(download_dir, zip_files[0]), "r") as zf:
+            csv_names = [n for n in zf.namelist() if n.endswith(".csv")]
+            if not csv_names:
+                print(f"❌ No CSV inside {zip_files[0]} for {comp_id}")
+                return None
+            return zf.read(csv_names[0])
+
+    # Some CLI versions write the CSV unzipped
+    csv_files = [f for f in files if f.endswith(".csv")]
+    if csv_files:
+        with open(os.path.join(download_dir, csv_files[0]), "rb") as f:
+            return f.read()
+
+    print(f"❌ No leaderboard file downloaded for {comp_id}")
+    return None
+
+
+def _parse_download(comp_id, download_dir, previous=None):
+    """Parse the downloaded leaderboard, or return `previous` if the CSV is byte-identical to it."""
+    data = _read_download(comp_id, download_dir)
+    if data is None:
+        return None
+
+    fingerprint = hashlib.sha256(data).hexdigest()
+    if previous is not None and previous.fingerprint == fingerprint:
+        return previous
+
+    board = parse_leaderboard_csv(io.BytesIO(data))
+    board.fingerprint = fingerprint
+    return board
@@ -0,0 +1,123 @@
+from utils.db import KAGGLE_DB, get_database
+
+
+class KaggleLinkDirectory:
+    """
+    In-memory, bidirectional discord_id <-> kaggle_id map over the kaggle_links table.
+
+    Loaded once, then kept in sync write-through: link/unlink write SQLite first and only
+    update memory once the write succeeded. Reads never touch the database.
+    Kaggle usernames are matched case-insensitively in the reverse map.
+    Listeners registered with add_listener are called with the discord_id after every change.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._listeners = []
+        self._by_discord = {}  # {discord_id: (kaggle_id, verified)}
+        self._by_kaggle = {}  # {kaggle_id.lower(): discord_id}
+        self.db.run_blocking(self._init_db)
+        self._load(self.db.run_blocking(lambda conn: conn.execute(
+            "SELECT discord_id, kaggle_id, verified FROM kaggle_links"
+        ).fetchall()))
+
+    @staticmethod
+    def _init_db(conn):
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS kaggle_links (
+            discord_id TEXT PRIMARY KEY,
+            kaggle_id TEXT UNIQUE,
+            verified INTEGER DEFAULT 0
+        )
+        """)
+        conn.commit()
+
+    def _load(self, rows):
+        self._by_discord = {str(d): ((k or "").strip(), bool(v)) for d, k, v in rows}
+        self._by_kaggle = {k.lower(): d for d, (k, _) in self._by_discord.items() if k}
+
+    def __len__(self):
+        return len(self._by_discord)
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _changed(self, discord_id):
+        for fn in list(self._listeners):
+            fn(discord_id)
+
+    def get(self, discord_id):
+        """Return (kaggle_id, verified) for a Discord user, or None if unlinked."""
+        return self._by_discord.get(str(discord_id))
+
+    def kaggle_id(self, discord_id):
+        entry = self._by_discord.get(str(discord_id))
+        return entry[0] if entry else None
+
+    def owner(self, kaggle_id: str):
+        """Return the discord_id a Kaggle username is linked to, or None."""
+        return self._by_kaggle.get((kaggle_id or "").strip().lower())
+
+    def kaggle_ids(self, discord_ids):
+        """Return {discord_id_str: kaggle_id} for every linked user among discord_ids."""
+        out = {}
+        for d in discord_ids:
+            entry = self._by_discord.get(str(d))
+            if entry:
+                out[str(d)] = entry[0]
+        return out
+
+    def items(self):
+        """Return [(discord_id, kaggle_id, verified), ...] for every link."""
+        return [(d, k, v) for d, (k, v) in self._by_discord.items()]
+
+    async def link(self, discord_id, kaggle_id: str, verified: bool = True):
+        discord_id = str(discord_id)
+        await self.db.execute("""
+            INSERT INTO kaggle_links (discord_id, kaggle_id, verified)
+            VALUES (?, ?, ?)
+            ON CONFLICT(discord_id) DO UPDATE SET kaggle_id=excluded.kaggle_id, verified=excluded.verified
+        """, (discord_id, kaggle_id, 1 if verified else 0))
+
+        old = self._by_discord.get(discord_id)
+        if old and old[0]:
+            self._by_kaggle.pop(old[0].lower(), None)
+        self._by_discord[discord_id] = (kaggle_id, verified)
+        self._by_kaggle[kaggle_id.lower()] = discord_id
+        self._changed(discord_id)
+
+    async def set_verified(self, discord_id, verified: bool):
+        """Flip a link's verified flag, keeping the Kaggle ID."""
+        discord_id = str(discord_id)
+        entry = self._by_discord.get(discord_id)
+        if entry is None:
+            return
+        await self.db.execute("UPDATE kaggle_links SET verified=? WHERE discord_id=?",
+                              (1 if verified else 0, discord_id))
+        self._by_discord[discord_id] = (entry[0], verified)
+
+    async def unlink(self, discord_id) -> bool:
+        """Remove a user's link. Returns False if they had none."""
+        discord_id = str(discord_id)
+        changes = await self.db.execute("DELETE FROM kaggle_links WHERE discord_id = ?", (discord_id,))
+        old = self._by_discord.pop(discord_id, None)
+        if old and old[0]:
+            self._by_kaggle.pop(old[0].lower(), None)
+        if old:
+            self._changed(discord_id)
+        return changes > 0
+
+
+_directory = None
+
+
+def get_link_directory() -> KaggleLinkDirectory:
+    """Return the bot-wide link directory, loading it from kaggle.db on first use."""
+    global _directory
+    if _directory is None:
+        _directory = KaggleLinkDirectory(get_database(KAGGLE_DB))
+    return _directory
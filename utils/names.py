@@ -0,0 +1,57 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class LinkedNameIndex:
+    """
+    Linked members of one guild, kept sorted by display name.
+
+    Built once from the link directory, then updated one member at a time (on link/unlink and
+    member update events) with a binary search, so listing never re-sorts or re-resolves members.
+    Pages are addressed by key (keyset pagination): a page is the `n` entries after or before a
+    cursor, which stays correct when members are added or renamed between page turns.
+    """
+
+    def __init__(self, guild, links):
+        self.guild = guild
+        self.links = links
+        self._keys = []  # sorted [(display name casefolded, discord_id)]
+        self._key_of = {}  # {discord_id: key}
+        self.rebuild()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def label(self, discord_id) -> str:
+        member = self.guild.get_member(int(discord_id))
+        return member.display_name if member else f"Unknown({discord_id})"
+
+    def _key(self, discord_id):
+        return self.label(discord_id).casefold(), discord_id
+
+    def rebuild(self):
+        self._key_of = {d: self._key(d) for d, _, _ in self.links.items()}
+        self._keys = sorted(self._key_of.values())
+
+    def update(self, discord_id):
+        """Re-place one member after their name or link changed (drops them if no longer linked)."""
+        discord_id = str(discord_id)
+        old = self._key_of.pop(discord_id, None)
+        if old is not None:
+            i = bisect_left(self._keys, old)
+            if i < len(self._keys) and self._keys[i] == old:
+                del self._keys[i]
+        if self.links.get(discord_id) is not None:
+            key = self._key(discord_id)
+            self._key_of[discord_id] = key
+            insort(self._keys, key)
+
+    def page_after(self, cursor, n: int):
+        """Up to n keys after `cursor` (from the start if None). Returns (keys, position of the first)."""
+        start = 0 if cursor is None else bisect_right(self._keys, cursor)
+        return self._keys[start:start + n], start
+
+    def page_before(self, cursor, n: int):
+        """Up to n keys before `cursor`. Returns (keys, position of the first)."""
+        end = bisect_left(self._keys, cursor)
+        start = max(end - n, 0)
+        return self._keys[start:start + n], start
@@ -0,0 +1,62 @@
+import discord
+
+PAGE_TIMEOUT = 120  # seconds page buttons stay active
+
+
+class OwnerView(discord.ui.View):
+    """
+    Button view only the invoking member can use. The buttons are removed from `message`
+    (set it after sending) once the view times out.
+    """
+
+    def __init__(self, author_id, command: str, timeout: float = PAGE_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.command = command
+        self.message = None
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message(
+                f"Only the person who ran `{self.command}` can turn its pages.", ephemeral=True
+            )
+            return False
+        return True
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+
+class PageView(OwnerView):
+    """
+    ◀ ▶ buttons over a fixed number of pages. `render(page_index)` returns the message edit
+    kwargs (content=... and/or embed=...) for one page; only the page being shown is rendered.
+    """
+
+    def __init__(self, render, pages: int, author_id, command: str, timeout: float = PAGE_TIMEOUT):
+        super().__init__(author_id, command, timeout)
+        self.render = render
+        self.pages = pages
+        self.page = 0
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+
+    async def _turn(self, interaction, page):
+        self.page = max(0, min(page, self.pages - 1))
+        self._sync_buttons()
+        await interaction.response.edit_message(view=self, **self.render(self.page))
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self._turn(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self._turn(interaction, self.page + 1)
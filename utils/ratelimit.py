@@ -0,0 +1,226 @@
+import asyncio
+import heapq
+import os
+import random
+import re
+import time
+
+# Priority classes, most urgent first
+PRIORITY_FREEZE = 0  # scores frozen when a timer runs out
+PRIORITY_JOIN = 1  # join / forcejoin baselines
+PRIORITY_LEADERBOARD = 2  # ;comp leaderboard views
+PRIORITY_BROWSE = 3  # gitgud, profile lookups, verification and background refreshes
+PRIORITY_BULK = 4  # bulk jobs (re-verifying every link); only gets what nobody else wants
+PRIORITY_NAMES = {
+    PRIORITY_FREEZE: "freeze",
+    PRIORITY_JOIN: "join",
+    PRIORITY_LEADERBOARD: "leaderboard",
+    PRIORITY_BROWSE: "browse",
+    PRIORITY_BULK: "bulk",
+}
+
+# Sustained Kaggle requests per second across the whole bot, and how many may go out back to back
+KAGGLE_RATE = float(os.getenv("KAGGLE_RATE", "1"))
+KAGGLE_BURST = int(os.getenv("KAGGLE_BURST", "5"))
+# Retries for throttled (429) or failing (5xx) calls, with exponential backoff between them (seconds)
+KAGGLE_MAX_RETRIES = int(os.getenv("KAGGLE_MAX_RETRIES", "4"))
+KAGGLE_BACKOFF_BASE = float(os.getenv("KAGGLE_BACKOFF_BASE", "2"))
+KAGGLE_BACKOFF_MAX = float(os.getenv("KAGGLE_BACKOFF_MAX", "60"))
+
+# What a throttled / failing Kaggle response looks like in CLI output
+_RETRYABLE_OUTPUT = re.compile(r"\b(429|5\d\d)\b|too many requests|service unavailable", re.IGNORECASE)
+
+
+class KaggleRetryableError(Exception):
+    """A Kaggle call failed in a way worth retrying (HTTP 429 or 5xx)."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def is_retryable_status(status) -> bool:
+    return status is not None and (status == 429 or 500 <= status < 600)
+
+
+def is_retryable_output(text: str) -> bool:
+    """True if Kaggle CLI output reports throttling or a server error."""
+    return bool(_RETRYABLE_OUTPUT.search(text or ""))
+
+
+def status_of(exc):
+    """HTTP status carried by a Kaggle API client exception, if any."""
+    status = getattr(exc, "status", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds form only), or None."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class KaggleRequest:
+    """A caller's place in the limiter queue. Its priority can be raised while it waits."""
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.future = None  # set while queued
+
+
+class KaggleRateLimiter:
+    """
+    One token bucket shared by every Kaggle call the bot makes (CLI downloads, API and HTTP).
+
+    Waiting callers are served strictly by priority class, then first come first served, so a
+    freeze never queues behind people browsing ;gitgud. `call` retries 429/5xx failures with
+    exponential backoff (or the server's Retry-After), and a throttled response pauses the whole
+    bucket, not just the caller that hit it.
+    """
+
+    def __init__(self, rate: float = KAGGLE_RATE, burst: int = KAGGLE_BURST,
+                 max_retries: int = KAGGLE_MAX_RETRIES,
+                 backoff_base: float = KAGGLE_BACKOFF_BASE, backoff_max: float = KAGGLE_BACKOFF_MAX):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._heap = []  # [(priority, seq, KaggleRequest)]; stale entries skipped on pop
+        self._seq = 0
+        self._timer = None  # pending call_later that wakes the dispatcher
+        self.stats = {
+            "granted": {name: 0 for name in PRIORITY_NAMES.values()},
+            "waited": 0.0,  # total seconds callers spent queued
+            "max_depth": 0,
+            "retries": 0,
+            "throttled": 0,
+            "gave_up": 0,
+        }
+
+    # ---- queue ----
+    def queue_depth(self):
+        """Return {priority name: callers currently waiting}."""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for _, _, request in self._live_entries():
+            depth[PRIORITY_NAMES[request.priority]] += 1
+        return depth
+
+    def _live_entries(self):
+        return [e for e in self._heap
+                if e[2].future is not None and not e[2].future.done() and e[0] == e[2].priority]
+
+    def _push(self, request):
+        self._seq += 1
+        heapq.heappush(self._heap, (request.priority, self._seq, request))
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()  # no-op when we are the timer firing
+            self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        while self._heap:
+            priority, _, request = self._heap[0]
+            if request.future is None or request.future.done() or priority != request.priority:
+                heapq.heappop(self._heap)  # granted, cancelled or promoted
+                continue
+            if now < self._paused_until or self._tokens < 1:
+                break
+            heapq.heappop(self._heap)
+            self._tokens -= 1
+            request.future.set_result(None)
+
+        if self._heap and self._timer is None:
+            wait = max(self._paused_until - now, (1 - self._tokens) / self.rate if self.rate > 0 else 1.0, 0.0)
+            self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+
+    async def acquire(self, request):
+        """Wait until `request` may make one Kaggle call."""
+        loop = asyncio.get_running_loop()
+        request.future = loop.create_future()
+        self._push(request)
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self._live_entries()))
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await request.future
+        finally:
+            request.future = None
+        self.stats["waited"] += time.monotonic() - started
+        self.stats["granted"][PRIORITY_NAMES[request.priority]] += 1
+
+    def promote(self, request, priority: int):
+        """Raise a queued request's priority (lower number = more urgent)."""
+        if priority >= request.priority:
+            return
+        request.priority = priority
+        if request.future is not None and not request.future.done():
+            self._push(request)
+            self._dispatch()
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds`, e.g. after Kaggle throttled us."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until  # no tokens accrue while paused
+        if self._heap:
+            self._dispatch()  # re-arms the timer for the end of the pause
+
+    # ---- calls ----
+    async def call(self, request, fn, *args):
+        """
+        Run `await fn(*args)` once a token is available, retrying KaggleRetryableError with
+        exponential backoff. `request` is a KaggleRequest or a bare priority.
+        """
+        if not isinstance(request, KaggleRequest):
+            request = KaggleRequest(request)
+        attempt = 0
+        while True:
+            await self.acquire(request)
+            try:
+                return await fn(*args)
+            except KaggleRetryableError as e:
+                if e.status == 429:
+                    self.stats["throttled"] += 1
+                if attempt >= self.max_retries:
+                    self.stats["gave_up"] += 1
+                    raise
+                delay = e.retry_after
+                if delay is None:
+                    delay = min(self.backoff_base * 2 ** attempt, self.backoff_max) * random.uniform(0.5, 1.0)
+                attempt += 1
+                self.stats["retries"] += 1
+                print(f"🐢 Kaggle call failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                if e.status == 429:
+                    self.pause(delay)
+                else:
+                    await asyncio.sleep(delay)
+
+
+_limiter = None
+
+
+def get_kaggle_limiter() -> KaggleRateLimiter:
+    """Return the bot-wide Kaggle rate limiter."""
+    global _limiter
+    if _limiter is None:
+        _limiter = KaggleRateLimiter()
+    return _limiter
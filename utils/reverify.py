@@ -0,0 +1,192 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import aiohttp
+
+from utils.db import KAGGLE_DB, get_database
+from utils.http import probe
+from utils.ratelimit import PRIORITY_BULK, KaggleRetryableError, get_kaggle_limiter
+
+# Profiles checked at once, and how often the scheduled run happens (seconds)
+REVERIFY_CONCURRENCY = int(os.getenv("KAGGLE_REVERIFY_CONCURRENCY", "4"))
+REVERIFY_INTERVAL = float(os.getenv("KAGGLE_REVERIFY_INTERVAL", str(7 * 24 * 3600)))
+# Results are written (and become resumable) in batches of this size
+REVERIFY_BATCH = 50
+
+# ok: profile exists under the linked name; missing: 404; renamed: Kaggle redirected to another
+# username; error: couldn't tell this time (throttled, timeout, unexpected status)
+STATUSES = ("ok", "missing", "renamed", "error")
+
+
+class ReverifyJob:
+    """
+    Re-checks every kaggle_links row against kaggle.com.
+
+    Each run is recorded in reverify_runs and every checked link in reverify_results, so a run
+    interrupted by a restart picks up where it stopped. Links whose profile is gone or renamed are
+    marked unverified (their owners can ;kaggle identify again). Requests go through the rate
+    limiter at bulk priority with at most REVERIFY_CONCURRENCY in flight, so user commands always
+    go first.
+    """
+
+    def __init__(self, links, db=None, limiter=None, concurrency: int = REVERIFY_CONCURRENCY):
+        self.links = links
+        self.db = db or get_database(KAGGLE_DB)
+        self.limiter = limiter or get_kaggle_limiter()
+        self.concurrency = concurrency
+        self.progress = None  # {"run_id", "total", "done", "counts"} of the current run
+        self._task = None
+        self.db.run_blocking(self._init_db)
+
+    @staticmethod
+    def _init_db(conn):
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS reverify_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trigger TEXT,
+            started_at REAL,
+            finished_at REAL,
+            total INTEGER
+        )""")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS reverify_results (
+            run_id INTEGER,
+            discord_id TEXT,
+            kaggle_id TEXT,
+            status TEXT,
+            detail TEXT,
+            checked_at REAL,
+            PRIMARY KEY (run_id, discord_id)
+        )""")
+        conn.commit()
+
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, trigger: str):
+        """Start (or resume) a run in the background; returns its task. Only one run at a time."""
+        if not self.running():
+            self._task = asyncio.create_task(self._run(trigger))
+            self._task.add_done_callback(self._log_failure)
+        return self._task
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️ Kaggle re-verification run failed (resumes on the next attempt): {task.exception()}")
+
+    async def pending_run(self):
+        """The unfinished run left over from before a restart, as (run_id, trigger), or None."""
+        return await self.db.fetchone(
+            "SELECT run_id, trigger FROM reverify_runs WHERE finished_at IS NULL ORDER BY run_id DESC LIMIT 1"
+        )
+
+    async def last_finished_at(self) -> float:
+        row = await self.db.fetchone("SELECT MAX(finished_at) FROM reverify_runs")
+        return row[0] or 0.0
+
+    async def _run(self, trigger):
+        pending = await self.pending_run()
+        counts = Counter()
+        done = set()
+        if pending:
+            run_id = pending[0]
+            for discord_id, status in await self.db.fetchall(
+                "SELECT discord_id, status FROM reverify_results WHERE run_id=?", (run_id,)
+            ):
+                done.add(discord_id)
+                counts[status] += 1
+            print(f"🔁 Resuming Kaggle re-verification run {run_id} ({len(done)} already checked)")
+        else:
+            def _new_run(conn):
+                return conn.execute(
+                    "INSERT INTO reverify_runs (trigger, started_at, total) VALUES (?, ?, ?)",
+                    (trigger, time.time(), len(self.links)),
+                ).lastrowid
+            run_id = await self.db.transaction(_new_run)
+            print(f"🔍 Starting Kaggle re-verification run {run_id} ({trigger}) for {len(self.links)} link(s)")
+
+        queue = asyncio.Queue()
+        for discord_id, kaggle_id, _ in self.links.items():
+            if discord_id not in done:
+                queue.put_nowait((discord_id, kaggle_id))
+        self.progress = {"run_id": run_id, "total": len(done) + queue.qsize(), "done": len(done), "counts": counts}
+        batch = []
+
+        async def flush():
+            nonlocal batch
+            rows, batch = batch, []
+            if not rows:
+                return
+            await self.db.executemany(
+                "INSERT OR REPLACE INTO reverify_results VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            for _, discord_id, kaggle_id, status, _, _ in rows:
+                # Only if the user hasn't re-linked something else in the meantime
+                if status in ("missing", "renamed") and self.links.kaggle_id(discord_id) == kaggle_id:
+                    await self.links.set_verified(discord_id, False)
+
+        async def worker():
+            while not queue.empty():
+                discord_id, kaggle_id = queue.get_nowait()
+                status, detail = await self.check(kaggle_id)
+                batch.append((run_id, discord_id, kaggle_id, status, detail, time.time()))
+                counts[status] += 1
+                self.progress["done"] += 1
+                if len(batch) >= REVERIFY_BATCH:
+                    await flush()
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        await flush()
+
+        await self.db.execute(
+            "UPDATE reverify_runs SET finished_at=?, total=? WHERE run_id=?",
+            (time.time(), self.progress["total"], run_id),
+        )
+        summary = ", ".join(f"{counts.get(s, 0)} {s}" for s in STATUSES)
+        print(f"✅ Kaggle re-verification run {run_id} finished: {summary}")
+        return run_id
+
+    async def check(self, kaggle_id: str):
+        """Check one Kaggle username. Returns (status, detail)."""
+        url = f"https://www.kaggle.com/{kaggle_id}"
+        try:
+            status, final_url = await self.limiter.call(PRIORITY_BULK, probe, url)
+        except (KaggleRetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return "error", (str(e) or type(e).__name__)[:200]
+        if status == 404:
+            return "missing", None
+        if status != 200:
+            return "error", f"HTTP {status}"
+        landed = urlparse(final_url).path.strip("/").split("/")[0]
+        if landed and landed.lower() != kaggle_id.lower():
+            return "renamed", landed
+        return "ok", None
+
+    async def report(self, run_id=None, limit: int = 15):
+        """
+        Summary of a run (the latest one by default): (run row, {status: count}, problem rows).
+        Problem rows are [(discord_id, kaggle_id, status, detail)] for missing/renamed links.
+        """
+        if run_id is None:
+            run = await self.db.fetchone(
+                "SELECT run_id, trigger, started_at, finished_at, total FROM reverify_runs ORDER BY run_id DESC LIMIT 1"
+            )
+        else:
+            run = await self.db.fetchone(
+                "SELECT run_id, trigger, started_at, finished_at, total FROM reverify_runs WHERE run_id=?", (run_id,)
+            )
+        if run is None:
+            return None, {}, []
+        counts = dict(await self.db.fetchall(
+            "SELECT status, COUNT(*) FROM reverify_results WHERE run_id=? GROUP BY status", (run[0],)
+        ))
+        problems = await self.db.fetchall("""
+            SELECT discord_id, kaggle_id, status, detail FROM reverify_results
+            WHERE run_id=? AND status IN ('missing', 'renamed')
+            ORDER BY status, kaggle_id LIMIT ?
+        """, (run[0], limit))
+        return run, counts, problems
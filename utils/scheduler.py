@@ -0,0 +1,101 @@
+import asyncio
+import heapq
+import time
+
+
+class ExpiryScheduler:
+    """
+    One timer for every participant in every competition.
+
+    Expiries live in a heap keyed by unix time; a single background task sleeps until the
+    earliest one and hands everything that is due to `on_expire(comp_type, [user_id, ...])`,
+    batched per competition. Cancelling or rescheduling just replaces the entry in
+    `_expiries`; stale heap entries are skipped when they surface (lazy deletion).
+    Nothing is persisted here: the participants table is the source of truth and the
+    schedule is rebuilt from it on startup.
+    """
+
+    def __init__(self, on_expire):
+        self.on_expire = on_expire
+        self._heap = []  # [(expires_at, comp_type, user_id)]
+        self._expiries = {}  # {(comp_type, user_id): expires_at} — the live entries
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._firing = set()  # on_expire tasks still running; kept so they aren't collected mid-run
+
+    def __len__(self):
+        return len(self._expiries)
+
+    def schedule(self, comp_type: str, user_id: str, expires_at: float):
+        """Schedule (or reschedule) a participant's freeze at unix time expires_at."""
+        self._expiries[(comp_type, user_id)] = expires_at
+        heapq.heappush(self._heap, (expires_at, comp_type, user_id))
+        if self._heap[0][0] == expires_at:
+            self._wakeup.set()  # new earliest entry; re-arm the sleep
+
+    def cancel(self, comp_type: str, user_id: str):
+        self._expiries.pop((comp_type, user_id), None)
+
+    def cancel_comp(self, comp_type: str):
+        for key in [k for k in self._expiries if k[0] == comp_type]:
+            del self._expiries[key]
+
+    def expires_at(self, comp_type: str, user_id: str):
+        return self._expiries.get((comp_type, user_id))
+
+    def upcoming(self, comp_type: str = None, n: int = 10):
+        """Return the next n [(expires_at, comp_type, user_id)], soonest first."""
+        entries = (
+            (when, ctype, uid) for (ctype, uid), when in self._expiries.items()
+            if comp_type is None or ctype == comp_type
+        )
+        return heapq.nsmallest(n, entries)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Stop the timer task and cancel any freezes still in flight."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._firing):
+            task.cancel()
+        self._firing.clear()
+
+    def _pop_due(self, now: float):
+        """Pop every live entry due by `now`, grouped as {comp_type: [user_id, ...]}."""
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            when, comp_type, user_id = heapq.heappop(self._heap)
+            if self._expiries.get((comp_type, user_id)) != when:
+                continue  # cancelled or rescheduled
+            del self._expiries[(comp_type, user_id)]
+            due.setdefault(comp_type, []).append(user_id)
+        return due
+
+    async def _run(self):
+        while True:
+            # Drop cancelled entries sitting on top so we don't wake up for nothing
+            while self._heap and self._expiries.get((self._heap[0][1], self._heap[0][2])) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+
+            timeout = max(0.0, self._heap[0][0] - time.time()) if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                continue  # schedule changed; recompute
+            except asyncio.TimeoutError:
+                pass
+
+            for comp_type, user_ids in self._pop_due(time.time()).items():
+                task = asyncio.create_task(self._fire(comp_type, user_ids))
+                self._firing.add(task)
+                task.add_done_callback(self._firing.discard)
+
+    async def _fire(self, comp_type, user_ids):
+        try:
+            await self.on_expire(comp_type, user_ids)
+        except Exception as e:
+            print(f"⚠️ Freeze for {len(user_ids)} participant(s) in {comp_type} failed: {e}")
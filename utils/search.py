@@ -0,0 +1,97 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it its of on or that the this to was with you your "
+    "we will can using use".split()
+)
+
+# Field weights: a word in the title says more about a competition than one in the description
+FIELD_WEIGHTS = {"title": 3, "tags": 2, "category": 2, "description": 1}
+
+
+def tokenize(text: str):
+    """Lowercase word tokens with stopwords dropped and plural 's' stripped (models -> model)."""
+    tokens = []
+    for tok in _TOKEN.findall((text or "").lower()):
+        if tok in _STOPWORDS:
+            continue
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+class CompetitionIndex:
+    """
+    Inverted index over catalog records for ranked (BM25) keyword search.
+
+    Each record's title, Kaggle tags, category and description are tokenized once; field weights
+    are folded into the term frequencies. A query only touches the postings of its own terms, so
+    searching the whole catalog takes milliseconds.
+    """
+
+    def __init__(self, records, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.refs = []  # doc number -> record ref
+        self.postings = {}  # {term: {doc: weighted term frequency}}
+        lengths = []
+        for record in records:
+            doc = len(self.refs)
+            self.refs.append(record["ref"])
+            tf = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                value = record.get(field)
+                if isinstance(value, list):
+                    value = " ".join(value)
+                for tok in tokenize(value):
+                    tf[tok] += weight
+            for term, freq in tf.items():
+                self.postings.setdefault(term, {})[doc] = freq
+            lengths.append(sum(tf.values()))
+        # `or 1.0`: every record may tokenize to nothing (e.g. a title made only of stopwords)
+        avg_length = (sum(lengths) / len(lengths) if lengths else 0.0) or 1.0
+        # BM25 length normalisation, precomputed per document
+        self.norms = [k1 * (1 - b + b * length / avg_length) for length in lengths]
+        n = len(self.refs)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.refs)
+
+    def _scores(self, query: str):
+        scores = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            weight = self.idf[term] * (self.k1 + 1)
+            norms = self.norms
+            for doc, tf in docs.items():
+                scores[doc] = scores.get(doc, 0.0) + weight * tf / (tf + norms[doc])
+        return scores
+
+    def search(self, query: str, limit: int = 50, allowed=None):
+        """
+        Return up to `limit` [(score, ref)] best first. Any query term can match; documents
+        matching more (and rarer) terms rank higher. `allowed` optionally restricts results to a set of refs.
+        """
+        scores = self._scores(query)
+        if allowed is not None:
+            scores = {doc: s for doc, s in scores.items() if self.refs[doc] in allowed}
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(score, self.refs[doc]) for doc, score in best]
+
+    def matching(self, query: str):
+        """Set of refs matching at least one query term."""
+        docs = set()
+        for term in set(tokenize(query)):
+            docs.update(self.postings.get(term, ()))
+        return {self.refs[doc] for doc in docs}
@@ -0,0 +1,150 @@
+import os
+
+from utils.db import get_database
+
+SNAPSHOT_DB = os.path.join("data", "leaderboard", "snapshots.db")
+
+
+class SnapshotStore:
+    """
+    Timestamped leaderboard history per comp_id, stored compactly on disk.
+
+    Every time a leaderboard changes, one row goes into `snapshots` (min/max/count at that time)
+    and only the names whose score changed go into `entries`. Ranks are not stored: one team
+    improving shifts everyone below it, and lookups only need the score. Downloads that turned
+    out identical just extend the latest snapshot's `last_seen`. This lets us answer
+    "what was user X's score at time T" without downloading anything.
+    """
+
+    def __init__(self, path: str = SNAPSHOT_DB):
+        self.db = get_database(path)
+        self._latest = {}  # {comp_id: {name: score}} as of the newest snapshot, loaded lazily
+        self.db.run_blocking(self._init_db)
+
+    @staticmethod
+    def _init_db(conn):
+        c = conn.cursor()
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            comp_id TEXT,
+            taken_at REAL,
+            last_seen REAL,
+            min_score REAL,
+            max_score REAL,
+            count INTEGER,
+            fingerprint TEXT,
+            PRIMARY KEY (comp_id, taken_at)
+        )""")
+        # score NULL means the name dropped off the leaderboard at taken_at
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS entries (
+            comp_id TEXT,
+            name TEXT,
+            taken_at REAL,
+            score REAL,
+            PRIMARY KEY (comp_id, name, taken_at)
+        ) WITHOUT ROWID""")
+        conn.commit()
+
+    @staticmethod
+    def _load_latest(c, comp_id):
+        c.execute("""
+            SELECT name, score, MAX(taken_at)
+            FROM entries
+            WHERE comp_id=?
+            GROUP BY name
+        """, (comp_id,))
+        return {name: score for name, score, _ in c.fetchall() if score is not None}
+
+    async def record(self, comp_id: str, board, taken_at: float):
+        """Store `board` as the state of comp_id at `taken_at` (unix time)."""
+        await self.db.transaction(self._record, comp_id, board, taken_at)
+
+    def _record(self, conn, comp_id, board, taken_at):
+        c = conn.cursor()
+        c.execute("""
+            SELECT taken_at, fingerprint FROM snapshots
+            WHERE comp_id=? ORDER BY taken_at DESC LIMIT 1
+        """, (comp_id,))
+        last = c.fetchone()
+        if last and board.fingerprint and last[1] == board.fingerprint:
+            # Same data as before; just note that it was still current at taken_at
+            c.execute("UPDATE snapshots SET last_seen=? WHERE comp_id=? AND taken_at=?",
+                      (taken_at, comp_id, last[0]))
+            return
+
+        previous = self._latest.get(comp_id)
+        if previous is None:
+            previous = self._load_latest(c, comp_id)
+
+        scores = board.scores.tolist()
+        current = {name: scores[row] for name, row in board.index.items()}
+        changed = [
+            (comp_id, name, taken_at, score)
+            for name, score in current.items()
+            if previous.get(name) != score
+        ]
+        changed.extend(
+            (comp_id, name, taken_at, None)
+            for name in previous.keys() - current.keys()
+        )
+
+        c.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                  (comp_id, taken_at, taken_at, board.min_score, board.max_score,
+                   board.count, board.fingerprint))
+        c.executemany("INSERT OR REPLACE INTO entries (comp_id, name, taken_at, score) VALUES (?, ?, ?, ?)", changed)
+        self._latest[comp_id] = current
+        print(f"🗂️ Stored leaderboard snapshot for {comp_id} ({len(changed)} changed entries)")
+
+    async def scores_as_of(self, comp_id: str, requests):
+        """
+        Look up scores on comp_id at given moments, all in one round trip.
+        `requests` is {kaggle_id: unix_time}. Returns {kaggle_id: (scores, staleness) or None}:
+        - scores: (user_score, min_score, max_score)
+        - staleness: seconds between the last time the snapshot was confirmed current and the
+          requested time (0 if it was still current then)
+        None means we have no snapshot taken at or before that time.
+        """
+        return await self.db.run(self._scores_as_of, comp_id, dict(requests))
+
+    @staticmethod
+    def _scores_as_of(conn, comp_id, requests):
+        c = conn.cursor()
+        snaps = {}  # {when: snapshot row}, people expiring together share one lookup
+        results = {}
+        for kaggle_id, when in requests.items():
+            if when not in snaps:
+                c.execute("""
+                    SELECT taken_at, last_seen, min_score, max_score FROM snapshots
+                    WHERE comp_id=? AND taken_at<=? ORDER BY taken_at DESC LIMIT 1
+                """, (comp_id, when))
+                snaps[when] = c.fetchone()
+            snap = snaps[when]
+            if not snap:
+                results[kaggle_id] = None
+                continue
+            _, last_seen, min_score, max_score = snap
+
+            c.execute("""
+                SELECT score FROM entries
+                WHERE comp_id=? AND name=? AND taken_at<=?
+                ORDER BY taken_at DESC LIMIT 1
+            """, (comp_id, (kaggle_id or "").strip().lower(), when))
+            row = c.fetchone()
+            user_score = row[0] if row and row[0] is not None else 0.0
+            # Fallbacks if CSV was weird/empty
+            scores = (
+                user_score,
+                user_score if min_score is None else min_score,
+                user_score if max_score is None else max_score,
+            )
+            results[kaggle_id] = (scores, max(0.0, when - last_seen))
+        return results
+
+    async def prune(self, comp_id: str):
+        """Forget all history for comp_id."""
+        def _prune(conn):
+            conn.execute("DELETE FROM snapshots WHERE comp_id=?", (comp_id,))
+            conn.execute("DELETE FROM entries WHERE comp_id=?", (comp_id,))
+            self._latest.pop(comp_id, None)
+        await self.db.transaction(_prune)